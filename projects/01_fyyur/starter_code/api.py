@@ -0,0 +1,288 @@
+import hashlib
+
+from flask import Blueprint, Response, abort, jsonify, request
+
+from models import db, Show, Artist, Venue
+from pagination import paginate
+from facets import requested_genres, genre_filter, genre_facets
+from deletes import delete_rows
+from calendar_view import calendar_window, calendar_shows, day_counts
+from scheduling import schedule_shows, expand_recurrence, parse_start_times, ScheduleError
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+BULK_DELETE_LIMIT = 1000
+
+'''
+RESOURCES
+    per resource: the model, the fields a client may ask for with
+    ?fields=a,b and the columns its listing is ordered and paginated by
+'''
+RESOURCES = {
+    'venues': (Venue,
+               ['id', 'name', 'city', 'state', 'address', 'phone',
+                'image_link', 'facebook_link', 'genres'],
+               ['name', 'id']),
+    'artists': (Artist,
+                ['id', 'name', 'city', 'state', 'phone',
+                 'image_link', 'facebook_link', 'genres'],
+                ['name', 'id']),
+    'shows': (Show,
+              ['id', 'artist_id', 'venue_id', 'start_time'],
+              ['start_time', 'id']),
+}
+
+
+def requested_fields(allowed):
+    '''
+    requested_fields(allowed)
+        the fields named in ?fields=, every allowed field when it is absent.
+        aborts with 400 on an unknown field.
+    '''
+    fields = request.args.get('fields')
+    if not fields:
+        return list(allowed)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if not fields or any(field not in allowed for field in fields):
+        abort(400)
+    return fields
+
+
+def projected_query(model, fields, sort):
+    '''
+    only the requested columns are SELECTed, plus the ones needed to
+    paginate and to compute the ETag
+    '''
+    names = list(dict.fromkeys(fields + sort + ['id', 'updated_at']))
+    return db.session.query(*[getattr(model, name).label(name) for name in names])
+
+
+def validators(rows, fields, *extra):
+    '''
+    validators(rows, fields, *extra)
+        a strong ETag derived from the version (id, updated_at) of every row
+        in the representation, and the Last-Modified of the newest one
+    '''
+    digest = hashlib.sha1(','.join(fields).encode('utf-8'))
+    for row in rows:
+        digest.update('|{}:{}'.format(row.id, row.updated_at.isoformat()).encode('utf-8'))
+    for value in extra:
+        digest.update('|{}'.format(value).encode('utf-8'))
+    last_modified = max((row.updated_at for row in rows), default=None)
+    return digest.hexdigest(), last_modified
+
+
+def conditional(etag, last_modified, build):
+    '''
+    conditional(etag, last_modified, build)
+        answers 304 when the client already holds this representation,
+        otherwise serializes it with build()
+    '''
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    else:
+        fresh = bool(request.if_modified_since and last_modified and
+                     last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+    response = Response(status=304) if fresh else build()
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def serialize(row, fields):
+    item = {}
+    for field in fields:
+        value = getattr(row, field)
+        item[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return item
+
+
+def list_resource(name):
+    model, allowed, sort = RESOURCES[name]
+    fields = requested_fields(allowed)
+    columns = [getattr(model, column) for column in sort]
+    query = projected_query(model, fields, sort).filter(*[column.isnot(None) for column in columns])
+    genres = requested_genres(request.args)
+    if genres:
+        if not hasattr(model, 'genres'):
+            abort(400)
+        query = genre_filter(query, model, genres)
+    page = paginate(query, columns,
+                    lambda row: tuple(getattr(row, column) for column in sort),
+                    after=request.args.get('after'), before=request.args.get('before'))
+    etag, last_modified = validators(page.items, fields, page.next_cursor, page.prev_cursor, *genres)
+    return conditional(etag, last_modified, lambda: jsonify({
+        'success': True,
+        name: [serialize(row, fields) for row in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }))
+
+
+def get_resource(name, resource_id):
+    model, allowed, sort = RESOURCES[name]
+    fields = requested_fields(allowed)
+    row = projected_query(model, fields, []).filter(model.id == resource_id).first()
+    if row is None:
+        abort(404)
+    etag, last_modified = validators([row], fields)
+    return conditional(etag, last_modified, lambda: jsonify({
+        'success': True,
+        name[:-1]: serialize(row, fields),
+    }))
+
+
+def facet_resource(model):
+    '''
+    genre -> count over the rows matching the ?genre= filter
+    '''
+    return jsonify({
+        'success': True,
+        'genres': [{'genre': genre, 'count': count}
+                   for genre, count in genre_facets(model, requested_genres(request.args))],
+    })
+
+
+def delete_resources(model):
+    '''
+    deletes the rows listed in a {"ids": [...]} body, with their shows
+    '''
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    if not isinstance(ids, list) or not 0 < len(ids) <= BULK_DELETE_LIMIT or \
+            not all(isinstance(id, int) and not isinstance(id, bool) for id in ids):
+        abort(400)
+    return jsonify({
+        'success': True,
+        'deleted': delete_rows(model, ids),
+    })
+
+
+@api.route('/venues')
+def list_venues():
+    return list_resource('venues')
+
+
+@api.route('/venues', methods=['DELETE'])
+def delete_venues():
+    return delete_resources(Venue)
+
+
+@api.route('/venues/<int:venue_id>')
+def get_venue(venue_id):
+    return get_resource('venues', venue_id)
+
+
+@api.route('/venues/facets')
+def venue_facets():
+    return facet_resource(Venue)
+
+
+@api.route('/artists')
+def list_artists():
+    return list_resource('artists')
+
+
+@api.route('/artists', methods=['DELETE'])
+def delete_artists():
+    return delete_resources(Artist)
+
+
+@api.route('/artists/<int:artist_id>')
+def get_artist(artist_id):
+    return get_resource('artists', artist_id)
+
+
+@api.route('/artists/facets')
+def artist_facets():
+    return facet_resource(Artist)
+
+
+@api.route('/shows')
+def list_shows():
+    return list_resource('shows')
+
+
+@api.route('/shows/batch', methods=['POST'])
+def schedule_show_batch():
+    '''
+    books {"venue_id", "artist_id"} for "duration" minutes (default 120)
+    either at every one of "start_times", or from "start_time" following
+    "rule" (a weekly / daily / ... name with "count", or an RRULE string).
+    start times overlapping a show of the venue or the artist come back
+    as conflicts.
+    '''
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400)
+    try:
+        if body.get('start_times') is not None:
+            if not isinstance(body['start_times'], list):
+                raise ScheduleError('start_times must be a list')
+            start_times = parse_start_times([str(value) for value in body['start_times']])
+        else:
+            start_time = parse_start_times([str(body.get('start_time') or '')])
+            if not start_time or not body.get('rule'):
+                raise ScheduleError('start_times, or start_time and rule, are required')
+            start_times = expand_recurrence(start_time[0], str(body['rule']), body.get('count'))
+        result = schedule_shows(body.get('venue_id'), body.get('artist_id'), start_times, body.get('duration'))
+    except ScheduleError as e:
+        return jsonify({
+            'success': False,
+            'error': 400,
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'success': True,
+        'scheduled': [start_time.isoformat() for start_time in result.scheduled],
+        'conflicts': [{'start_time': start_time.isoformat(), 'message': reason}
+                      for start_time, reason in result.conflicts],
+    }), 201
+
+
+@api.route('/calendar')
+def calendar():
+    '''
+    the shows starting in [from, to) (or ?month=YYYY-MM), optionally in
+    ?city= and by ?genre=, one cursor page at a time, and the number of
+    shows on every day of the window
+    '''
+    window = calendar_window(request.args)
+    page = paginate(calendar_shows(**window), [Show.start_time, Show.id],
+                    lambda row: (row.start_time, row.show_id),
+                    after=request.args.get('after'), before=request.args.get('before'))
+    return jsonify({
+        'success': True,
+        'from': window['start'].isoformat(),
+        'to': window['end'].isoformat(),
+        'days': [{'date': date.isoformat(), 'count': count}
+                 for date, count in day_counts(**window)],
+        'shows': [serialize(row, ['show_id', 'start_time', 'artist_id', 'artist_name',
+                                  'venue_id', 'venue_name', 'venue_city']) for row in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@api.route('/shows/<int:show_id>')
+def get_show(show_id):
+    return get_resource('shows', show_id)
+
+
+@api.errorhandler(400)
+def bad_request(error):
+    return jsonify({
+        'success': False,
+        'error': 400,
+        'message': 'bad request'
+    }), 400
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return jsonify({
+        'success': False,
+        'error': 404,
+        'message': 'resource not found'
+    }), 404
@@ -3,11 +3,9 @@
 #----------------------------------------------------------------------------#
 
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify
+import functools
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, stream_with_context, abort
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
@@ -16,6 +14,26 @@ from flask_migrate import Migrate
 import datetime
 from sqlalchemy.sql import func
 import array, string  
+from models import setup_db, db, Show, Artist, Venue, TRIGRAM_INDEXES
+from timeline import venue_timeline, artist_timeline, next_rollover
+from directory import venue_directory
+from pagination import paginate, StreamedPage, PAGE_SIZE, MAX_PAGE_SIZE
+from search import search
+from export import export_filters, export_rows, export_csv, export_jsonl
+from cli import fyyur_cli
+from api import api
+from pool_stats import pool_stats, init_pool
+from routing import init_routing
+from assets import init_assets
+from compression import init_compression
+from profiler import QueryProfiler
+from formatting import format_datetime, format_datetimes
+from facets import requested_genres, genre_filter, genre_facets, invalidate_facets
+from deletes import delete_rows
+from scheduling import schedule_shows, expand_recurrence, parse_start_times, ScheduleError
+from calendar_view import calendar_window, calendar_shows, day_counts, month_grid
+from edits import edited_values, update_row, EditConflict
+from cache import render_cache, init_cache, venue_key, artist_key, venue_page_keys, artist_page_keys
 
 
 #----------------------------------------------------------------------------#
@@ -25,74 +43,43 @@ import array, string
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+init_pool(app)
+setup_db(app)
+def include_object(object, name, type_, reflected, compare_to):
+    # the optional pg_trgm indexes are created by their migration only
+    return not (type_ == 'index' and name in TRIGRAM_INDEXES)
+
+
+migrate = Migrate(app, db, include_object=include_object)
+init_cache(app)
+init_routing(app)
+init_assets(app)
+init_compression(app, min_size=app.config['COMPRESS_MIN_SIZE'])
+profiler = QueryProfiler(app)
+app.cli.add_command(fyyur_cli)
+app.register_blueprint(api)
  
 
 # TODO: connect to a local postgresql database
 
-#----------------------------------------------------------------------------#
-# Models.
-#----------------------------------------------------------------------------#
-
-class Show(db.Model):
-    __tablename__ = 'Show'
-
-    id = db.Column(db.Integer, primary_key=True)
-    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-    start_time = db.Column(db.DateTime())
-    venue = db.relationship("Venue",back_populates="artists")
-    artist = db.relationship("Artist",back_populates="venues")
-
-class Artist(db.Model):
-    __tablename__ = 'Artist'
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(500), nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120))
-    phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String))
-    image_link = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120)) 
-    venues = db.relationship('Show', back_populates="artist",cascade="all,delete")
-
-class Venue(db.Model):
-    __tablename__ = 'Venue'
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(500), nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120))
-    address = db.Column(db.String(120))
-    phone = db.Column(db.String(120))
-    image_link = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String))
-    artists = db.relationship('Show', back_populates="venue",cascade="all,delete")
-    # TODO: implement any missing fields, as a database migration using Flask-Migrate
-
-
-# TODO: implement any missing fields, as a database migration using Flask-Migrate
-
-# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
-
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+app.jinja_env.filters['datetime'] = format_datetime
+app.jinja_env.filters['datetimes'] = format_datetimes
 
+STREAM_BUFFER = 64
 
-app.jinja_env.filters['datetime'] = format_datetime
+
+def stream_template(template_name, **context):
+    # renders the template while the response is sent, in chunks of
+    # STREAM_BUFFER template events, instead of into one string first
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(STREAM_BUFFER)
+    return stream_with_context(stream)
 
 #----------------------------------------------------------------------------#
 # Controllers.
@@ -112,10 +99,23 @@ def venues():
     # TODO: replace with real venues data.
     #       num_shows should be aggregated based on number of upcoming shows per venue.
 
-    allData=Venue.query.all() 
-    cityData=Venue.query.distinct(Venue.city).all() 
+    genres = requested_genres(request.args)
+    areas, page = venue_directory(genres, request.args.get('after'), request.args.get('before'))
+    return render_template('pages/venues.html', areas=areas, page=page,
+                           genres=genres, facets=genre_facets(Venue, genres))
 
-    return render_template('pages/venues.html', city=cityData,name=allData)
+
+@app.route('/venues.json')
+def venues_json():
+    # one page of the directory; follow next_cursor with ?after=, prev_cursor with ?before=
+    areas, page = venue_directory(requested_genres(request.args),
+                                  request.args.get('after'), request.args.get('before'))
+    return jsonify({
+        'success': True,
+        'areas': areas,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
 
 
 @app.route('/venues/search', methods=['POST'])
@@ -123,10 +123,7 @@ def search_venues():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # seach for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-    whichVenue=request.form.get('search_term') 
-    search = "%{}%".format(whichVenue)
-    response = Venue.query.filter(Venue.name.ilike(search)).all()
-    responseCount = Venue.query.filter(Venue.name.ilike(search)).count()
+    response, responseCount = search(Venue, request.form.get('search_term'))
     return render_template('pages/search_venues.html', results=response,count=responseCount, search_term=request.form.get('search_term', ''))
 
 
@@ -134,37 +131,11 @@ def search_venues():
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
     # TODO: replace with real venue data from the venues table, using venue_id
-    data = Venue.query.filter_by(id=venue_id).one() 
-    now = datetime.datetime.now()
-    # dataShow=Show.query.with_entities(Show.start_time,Artist.image_link,Artist.id,Artist.name,Venue.id,Venue.name,Venue.image_link).join(Venue, Show.venue_id == Venue.id)
-    # dataShowCount=Show.query.filter_by(venue_id=venue_id).join(Venue, Show.venue_id == Venue.id).count()
-    dataShow=Show.query.with_entities(Show.start_time,Artist.image_link,Artist.id,Artist.name,Venue.id,Venue.name,Venue.image_link).filter_by(venue_id=venue_id).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
-    dataShowCount=Show.query.filter_by(venue_id=venue_id).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).count()
-    
-    countUp = 0
-    countDown = 0
-    def testUp(n):
-        i = 0
-        while i < dataShowCount:
-            if dataShow[i][0] > now:
-                n += 1
-            if i == dataShowCount:
-                break 
-            i += 1
-        return n
-
-    def testDown(n):
-        i = 0
-        while i < dataShowCount:
-            if dataShow[i][0] < now:
-                n += 1
-            if i == dataShowCount:
-                break 
-            i += 1
-        return n 
-    
-    
-    return render_template('pages/show_venue.html', venue=data, time=now,data=dataShow,countShow=dataShowCount,u=testUp(countUp),d=testDown(countDown))
+    def render():
+        data = Venue.query.filter_by(id=venue_id).one() 
+        timeline = venue_timeline(venue_id)
+        return render_template('pages/show_venue.html', venue=data, timeline=timeline), next_rollover(timeline)
+    return render_cache.fetch(venue_key(venue_id), render)
 
 
 #  Create Venue
@@ -187,6 +158,7 @@ def create_venue_submission():
                          phone=form.phone.data, image_link=form.image_link.data, genres=request.form.getlist('genres') , facebook_link=form.facebook_link.data)
         db.session.add(newVenue)
         db.session.commit()
+        invalidate_facets(Venue)
         # on successful db insert, flash success
         flash('Venue ' + request.form['name'] + ' was successfully listed!')
         return redirect(url_for('venues'))
@@ -199,13 +171,12 @@ def create_venue_submission():
         return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@app.route('/venues/<int:venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
     # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-    VenueToDelete = Venue.query.filter_by(id=venue_id).one()
-    db.session.delete(VenueToDelete)
-    db.session.commit()
+    if not delete_rows(Venue, [venue_id]):
+        abort(404)
     return redirect(url_for('venues'))
 
     # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
@@ -218,8 +189,19 @@ def delete_venue(venue_id):
 @app.route('/artists')
 def artists():
     # TODO: replace with real data returned from querying the database
-    data = Artist.query.all()
-    return render_template('pages/artists.html', artists=data)
+    genres = requested_genres(request.args)
+    page = paginate(genre_filter(Artist.query, Artist, genres), [Artist.name, Artist.id],
+                    lambda artist: (artist.name, artist.id),
+                    after=request.args.get('after'), before=request.args.get('before'))
+    return render_template('pages/artists.html', artists=page.items, page=page,
+                           genres=genres, facets=genre_facets(Artist, genres))
+
+
+@app.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+    if not delete_rows(Artist, [artist_id]):
+        abort(404)
+    return redirect(url_for('artists'))
 
 
 @app.route('/artists/search', methods=['POST'])
@@ -227,10 +209,7 @@ def search_artists():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
     # search for "band" should return "The Wild Sax Band".
-    whichArtist=request.form.get('search_term') 
-    search = "%{}%".format(whichArtist)
-    response = Artist.query.filter(Artist.name.ilike(search)).all()
-    responseCount = Artist.query.filter(Artist.name.ilike(search)).count()
+    response, responseCount = search(Artist, request.form.get('search_term'))
 
     return render_template('pages/search_artists.html', results=response,count=responseCount, search_term=request.form.get('search_term', ''))
 
@@ -239,37 +218,11 @@ def search_artists():
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
     # TODO: replace with real artist data from the artists table, using artist_id
-    data = Artist.query.filter_by(id=artist_id).one()
-    now = datetime.datetime.now()
-    # dataShow=Show.query.with_entities(Show.start_time,Artist.image_link,Artist.id,Artist.name,Venue.id,Venue.name,Venue.image_link).join(Artist, Show.artist_id == artist_id)
-    # dataShowCount=Show.query.join(Artist, Show.artist_id == artist_id).join(Venue, Show.venue_id == Venue.id).count()
-    # dataShowCount=Show.query.filter_by(artist_id=artist_id).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id).count()
-    dataShow=Show.query.with_entities(Show.start_time,Artist.image_link,Artist.id,Artist.name,Venue.id,Venue.name,Venue.image_link).filter_by(artist_id=artist_id).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id)
-    dataShowCount=Show.query.filter_by(artist_id=artist_id).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id).count()
-    
-    countUp = 0
-    countDown = 0
-    def testUp(n):
-        i = 0
-        while i < dataShowCount:
-            if dataShow[i][0] > now:
-                n += 1
-            if i == dataShowCount:
-                break 
-            i += 1
-        return n
-
-    def testDown(n):
-        i = 0
-        while i < dataShowCount:
-            if dataShow[i][0] < now:
-                n += 1
-            if i == dataShowCount:
-                break 
-            i += 1
-        return n 
-    
-    return render_template('pages/show_artist.html', artist=data, time=now,data=dataShow,countShow=dataShowCount,u=testUp(countUp),d=testDown(countDown))
+    def render():
+        data = Artist.query.filter_by(id=artist_id).one()
+        timeline = artist_timeline(artist_id)
+        return render_template('pages/show_artist.html', artist=data, timeline=timeline), next_rollover(timeline)
+    return render_cache.fetch(artist_key(artist_id), render)
 
 #  Update
 #  ----------------------------------------------------------------
@@ -288,34 +241,30 @@ def edit_artist(artist_id):
         form.image_link.data = artist.image_link
         form.genres.data = artist.genres
         form.facebook_link.data = artist.facebook_link
+        form.version.data = artist.version
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
-    # TODO: take values from the form submitted, and update existing
-    # artist record with ID <artist_id> using the new attributes
-    form = ArtistForm()
-    artist = Artist.query.filter_by(id=artist_id).one()
-    if request.method == 'POST':
-        newName = request.form.get("name")
-        artist.name = newName
-        newCity = request.form.get("city")
-        artist.city = newCity
-        newState = request.form.get("state")
-        artist.state = newState
-        newPhone = request.form.get("phone")
-        artist.phone = newPhone
-        newImage_link = request.form.get("image_link")
-        artist.image_link = newImage_link
-        newGenres = request.form.getlist("genres")
-        artist.genres = newGenres
-        newFacebook_link = request.form.get("facebook_link")
-        artist.facebook_link = newFacebook_link
-        db.session.commit()
-        return redirect(url_for('show_artist', artist_id=artist_id))
-    else:
-        return render_template('forms/edit_artist.html', artist=artist)
+    # writes only the changed columns, unless the artist changed since the form was loaded
+    try:
+        changed = update_row(Artist, artist_id, request.form.get('version', type=int),
+                             edited_values(Artist, request.form))
+    except EditConflict as conflict:
+        if conflict.current is None:
+            abort(404)
+        flash('Artist ' + conflict.current.name + ' was changed by someone else while you were editing. '
+              'Review the current details and submit your changes again.')
+        form = ArtistForm(obj=conflict.current, formdata=None)
+        return render_template('forms/edit_artist.html', form=form, artist=conflict.current), 409
+    if changed is None:
+        abort(404)
+    if changed:
+        render_cache.invalidate(*artist_page_keys(artist_id))
+        if 'genres' in changed:
+            invalidate_facets(Artist)
+    return redirect(url_for('show_artist', artist_id=artist_id))
 
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
@@ -331,37 +280,31 @@ def edit_venue(venue_id):
         form.image_link.data = venue.image_link
         form.genres.data = venue.genres
         form.facebook_link.data = venue.facebook_link
+        form.version.data = venue.version
     # TODO: populate form with values from venue with ID <venue_id>
     return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
-    # TODO: take values from the form submitted, and update existing
-    # venue record with ID <venue_id> using the new attributes
-    form = VenueForm()
-    venue = Venue.query.filter_by(id=venue_id).one()
-    if request.method == 'POST':
-        newName = request.form.get("name")
-        venue.name = newName
-        newCity = request.form.get("city")
-        venue.city = newCity
-        newState = request.form.get("state")
-        venue.state = newState
-        newAddress = request.form.get("address")
-        venue.address = newAddress
-        newPhone = request.form.get("phone")
-        venue.phone = newPhone
-        newImage_link = request.form.get("image_link")
-        venue.image_link = newImage_link
-        newGenres = request.form.getlist("genres")
-        venue.genres = newGenres
-        newFacebook_link = request.form.get("facebook_link")
-        venue.facebook_link = newFacebook_link
-        db.session.commit()
-        return redirect(url_for('show_venue', venue_id=venue_id))
-    else:
-        return render_template('forms/edit_venue.html', venue=venue)
+    # writes only the changed columns, unless the venue changed since the form was loaded
+    try:
+        changed = update_row(Venue, venue_id, request.form.get('version', type=int),
+                             edited_values(Venue, request.form))
+    except EditConflict as conflict:
+        if conflict.current is None:
+            abort(404)
+        flash('Venue ' + conflict.current.name + ' was changed by someone else while you were editing. '
+              'Review the current details and submit your changes again.')
+        form = VenueForm(obj=conflict.current, formdata=None)
+        return render_template('forms/edit_venue.html', form=form, venue=conflict.current), 409
+    if changed is None:
+        abort(404)
+    if changed:
+        render_cache.invalidate(*venue_page_keys(venue_id))
+        if 'genres' in changed:
+            invalidate_facets(Venue)
+    return redirect(url_for('show_venue', venue_id=venue_id))
 
 
 #  Create Artist
@@ -385,6 +328,7 @@ def create_artist_submission():
                            image_link=form.image_link.data, genres=request.form.getlist('genres') , facebook_link=form.facebook_link.data)
         db.session.add(newArtist)
         db.session.commit()
+        invalidate_facets(Artist)
         # on successful db insert, flash success
         flash('Artist ' + request.form['name'] + ' was successfully listed!')
         return redirect(url_for('artists'))
@@ -404,9 +348,53 @@ def shows():
     # displays list of shows at /shows
     # TODO: replace with real venues data.
     #       num_shows should be aggregated based on number of upcoming shows per venue.
-    data = Artist.query.with_entities(Show.start_time,Artist.image_link,Artist.id,Artist.name,Venue.id,Venue.name).join(Show, Artist.id == Show.artist_id).outerjoin(Venue, Venue.id == Show.venue_id)
-
-    return render_template('pages/shows.html',len = len(list(data)), shows=data)
+    data = db.session.query(
+        Show.id.label('show_id'),
+        Show.start_time.label('start_time'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+    ).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id) \
+     .filter(Show.start_time.isnot(None))
+    per_page = min(max(request.args.get('per_page', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    page = StreamedPage(data, [Show.start_time, Show.id], lambda show: (show.start_time, show.show_id),
+                        after=request.args.get('after'), before=request.args.get('before'), per_page=per_page)
+
+    # the tiles are rendered and sent as the rows come off the cursor
+    return Response(stream_template('pages/shows.html', shows=page, page=page))
+
+
+@app.route('/calendar')
+def calendar():
+    # shows in a [from, to) window (a week from today by default, or
+    # ?month=YYYY-MM), optionally in one ?city= and ?genre=, with a grid of
+    # per-day counts
+    window = calendar_window(request.args)
+    page = paginate(calendar_shows(**window), [Show.start_time, Show.id],
+                    lambda show: (show.start_time, show.show_id),
+                    after=request.args.get('after'), before=request.args.get('before'))
+    return render_template('pages/calendar.html', window=window, shows=page.items, page=page,
+                           weeks=month_grid(day_counts(**window)), day=datetime.timedelta(days=1),
+                           genres=window['genres'],
+                           pager_args={'from': window['start'].isoformat(), 'to': window['end'].isoformat(),
+                                       'city': window['city']})
+
+
+@app.route('/shows/export.csv')
+def export_shows_csv():
+    # streams every show matching ?from=&to=&city=&venue_id= as CSV
+    rows = export_rows(**export_filters(request.args))
+    return Response(stream_with_context(export_csv(rows)), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=shows.csv'})
+
+
+@app.route('/shows/export.jsonl')
+def export_shows_jsonl():
+    rows = export_rows(**export_filters(request.args))
+    return Response(stream_with_context(export_jsonl(rows)), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=shows.jsonl'})
 
 
 @ app.route('/shows/create')
@@ -421,20 +409,87 @@ def create_show_submission():
     # called to create new shows in the db, upon submitting new show listing form
     # TODO: insert form data as a new Show record in the db, instead
     form=ShowForm()
-    if request.method == 'POST':
-        newShow=Show(artist_id=form.artist_id.data,
-                       venue_id=form.venue_id.data, start_time=form.start_time.data)
-        db.session.add(newShow)
-        db.session.commit()
-        # on successful db insert, flash success
-        flash('Show was successfully listed!')
-        return redirect(url_for('shows'))
-    # TODO: on unsuccessful db insert, flash an error instead.
-    # e.g., flash('An error occurred. Show could not be listed.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    else:
-        flash('An error occurred. Show could not be listed.')
-        return render_template('forms/new_show.html', form=form)
+    try:
+        if form.start_time.data is None:
+            raise ScheduleError('check the start time')
+        # the venue and the artist must both be free for the whole slot
+        result = schedule_shows(form.venue_id.data, form.artist_id.data,
+                                [form.start_time.data], form.duration.data)
+    except ScheduleError as e:
+        flash('An error occurred. Show could not be listed: {}.'.format(e))
+        return render_template('forms/new_show.html', form=form), 400
+    if result.conflicts:
+        flash('An error occurred. Show could not be listed: {}.'.format(result.conflicts[0][1]))
+        return render_template('forms/new_show.html', form=form), 409
+    # on successful db insert, flash success
+    flash('Show was successfully listed!')
+    return redirect(url_for('shows'))
+
+
+@app.route('/shows/schedule', methods=['GET'])
+def schedule_shows_form():
+    form = ShowBatchForm()
+    return render_template('forms/schedule_shows.html', form=form)
+
+
+@app.route('/shows/schedule', methods=['POST'])
+def schedule_shows_submission():
+    # books a list of start times, or a recurrence, in one transaction
+    form = ShowBatchForm()
+    try:
+        if not form.validate():
+            raise ScheduleError('check the artist, venue and start time')
+        start_times = parse_start_times((form.start_times.data or '').splitlines())
+        if not start_times:
+            if form.start_time.data is None:
+                raise ScheduleError('a start time is required')
+            if form.recurrence.data:
+                start_times = expand_recurrence(form.start_time.data, form.recurrence.data, form.occurrences.data)
+            else:
+                start_times = [form.start_time.data]
+        result = schedule_shows(form.venue_id.data, form.artist_id.data, start_times, form.duration.data)
+    except ScheduleError as e:
+        flash('An error occurred. Shows could not be scheduled: {}.'.format(e))
+        return render_template('forms/schedule_shows.html', form=form)
+    flash('{} {} successfully listed!'.format(
+        len(result.scheduled), 'show was' if len(result.scheduled) == 1 else 'shows were'))
+    for start_time, reason in result.conflicts:
+        flash('{:%Y-%m-%d %H:%M} was not listed: {}.'.format(start_time, reason))
+    return redirect(url_for('shows'))
+
+
+def stats_endpoint(view):
+    '''
+    stats_endpoint(view)
+        the view, answering 404 unless the STATS_ENDPOINTS config is on
+    '''
+    @functools.wraps(view)
+    def guarded(*args, **kwargs):
+        if not app.config['STATS_ENDPOINTS']:
+            abort(404)
+        return view(*args, **kwargs)
+    return guarded
+
+
+@app.route('/_stats/pool')
+@stats_endpoint
+def pool_statistics():
+    # live connection pool counters of the worker answering the request
+    return jsonify(pool_stats.snapshot(db.engine.pool))
+
+
+@app.route('/_stats/compression')
+@stats_endpoint
+def compression_statistics():
+    # response compression counters of this worker: ratio and CPU time spent
+    return jsonify(app.extensions['compression'].stats.snapshot())
+
+
+@app.route('/_stats/sql')
+@stats_endpoint
+def sql_statistics():
+    # per endpoint query counts of this worker, collected while SQL_PROFILER is on
+    return jsonify(profiler.snapshot())
 
 
 @ app.errorhandler(404)
@@ -0,0 +1,232 @@
+import io
+import itertools
+import sys
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import orm
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.util import await_only
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from app import app
+from models import db
+from routing import routed_bind
+
+'''
+ASYNC_ENDPOINTS
+    the read views served on the event loop. every other route is handed
+    to the WSGI app, which runs in asgiref's thread pool.
+'''
+ASYNC_ENDPOINTS = {
+    'venues', 'show_venue', 'search_venues',
+    'artists', 'show_artist', 'search_artists',
+    'shows',
+}
+
+
+def async_database_uri(config, bind=None):
+    '''
+    async_database_uri(config, bind)
+        SQLALCHEMY_ASYNC_DATABASE_URI, or SQLALCHEMY_DATABASE_URI switched to
+        the asyncpg driver; for a bind, its SQLALCHEMY_BINDS URI switched
+    '''
+    if bind is not None:
+        return make_url(config['SQLALCHEMY_BINDS'][bind]).set(drivername='postgresql+asyncpg')
+    if config.get('SQLALCHEMY_ASYNC_DATABASE_URI'):
+        return config['SQLALCHEMY_ASYNC_DATABASE_URI']
+    return make_url(config['SQLALCHEMY_DATABASE_URI']).set(drivername='postgresql+asyncpg')
+
+
+def wsgi_environ(scope, body):
+    '''
+    wsgi_environ(scope, body)
+        the WSGI environ of an ASGI http request, so Flask can build its
+        request context from it
+    '''
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': (scope.get('client') or ('127.0.0.1', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+class AsyncRoutingSession(orm.Session):
+    '''
+    AsyncRoutingSession
+        the sync session behind the AsyncSession of a request. it routes
+        like RoutingSession, SELECTs to the request's replica and the rest
+        to the primary, on the asyncpg engines of the FyyurASGI in its info
+    '''
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        bind = routed_bind(self, clause)
+        if bind is not None:
+            return self.info['asgi'].get_engine(bind).sync_engine
+        return super(AsyncRoutingSession, self).get_bind(mapper, clause, **kw)
+
+
+class FyyurASGI(object):
+    '''
+    FyyurASGI(app)
+        serves the app over ASGI. requests for ASYNC_ENDPOINTS are dispatched
+        on the event loop: the unchanged Flask view, templates and hooks run
+        inside AsyncSession.run_sync, with db.session bound to that greenlet's
+        session, so every query is awaited on the asyncpg engine and the
+        loop serves other requests meanwhile. reads go to the replicas the
+        same way as under WSGI. the rest go to the WSGI app.
+    '''
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WsgiToAsgi(app)
+        self.engines = {}
+
+    def get_engine(self, bind=None):
+        '''
+        get_engine(bind)
+            the asyncpg engine of the primary, or of the replica bind
+        '''
+        if bind not in self.engines:
+            self.engines[bind] = create_async_engine(
+                async_database_uri(self.app.config, bind),
+                **self.app.config.get('SQLALCHEMY_ASYNC_ENGINE_OPTIONS', {}))
+        return self.engines[bind]
+
+    async def dispose(self):
+        engines, self.engines = self.engines, {}
+        for engine in engines.values():
+            await engine.dispose()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http' or self.async_endpoint(scope) is None:
+            return await self.wsgi(scope, receive, send)
+
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        environ = wsgi_environ(scope, body)
+        ctx = self.app.request_context(environ)
+        ctx.push()
+        try:
+            await self.run_sync(lambda: self.respond(environ, send))
+        finally:
+            ctx.pop()
+
+    def respond(self, environ, send):
+        '''
+        respond(environ, send)
+            dispatches the request and sends its response chunk by chunk as
+            the body is drawn. it runs inside run_sync: a streamed response
+            such as /shows still reads rows from the database while it is
+            iterated, and each send is awaited from the greenlet.
+        '''
+        try:
+            status, headers, chunks = self.encode(environ, self.app.full_dispatch_request())
+        except Exception as e:
+            status, headers, chunks = self.encode(environ, self.app.handle_exception(e))
+        await_only(send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                        for name, value in headers],
+        }))
+        for chunk in chunks:
+            if chunk:
+                await_only(send({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+        await_only(send({'type': 'http.response.body', 'body': b''}))
+
+    def encode(self, environ, response):
+        '''
+        encode(environ, response)
+            the status, headers and (lazy) body to send, passed through the
+            app's CompressionMiddleware like those of the WSGI routes
+        '''
+        compression = self.app.extensions.get('compression')
+        if compression is None:
+            return response.status_code, list(response.headers.items()), response.iter_encoded()
+        started = {}
+
+        def replay(environ, start_response):
+            start_response(response.status, list(response.headers.items()))
+            return response.iter_encoded()
+
+        def start_response(status, headers, exc_info=None):
+            started.update(status=int(status.split(None, 1)[0]), headers=headers)
+
+        chunks = iter(compression.respond(replay, environ, start_response))
+        # the middleware holds the headers back until it has seen enough
+        # of the body to decide whether to compress it
+        first = next(chunks, None)
+        head = [first] if first is not None else []
+        return started['status'], started['headers'], itertools.chain(head, chunks)
+
+    def async_endpoint(self, scope):
+        adapter = self.app.url_map.bind('localhost', script_name=scope.get('root_path') or None)
+        try:
+            endpoint, _ = adapter.match(scope['path'], method=scope['method'])
+        except (HTTPException, RequestRedirect):
+            return None
+        return endpoint if endpoint in ASYNC_ENDPOINTS else None
+
+    async def run_sync(self, fn):
+        '''
+        run_sync(fn)
+            calls fn() in a greenlet whose db.session is an AsyncSession's
+            sync facade; its blocking calls become awaits on the engine
+        '''
+        async with AsyncSession(self.get_engine(), sync_session_class=AsyncRoutingSession,
+                                info={'asgi': self}) as session:
+            def call(sync_session):
+                db.session.registry.set(sync_session)
+                try:
+                    return fn()
+                finally:
+                    db.session.registry.clear()
+            return await session.run_sync(call)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+'''
+asgi_app
+    run with: uvicorn asgi:asgi_app --workers 1
+'''
+asgi_app = FyyurASGI(app)
@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from collections import namedtuple
+
+from flask import current_app, request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+'''
+ASSET_PREFIX
+    the static filenames fingerprinted assets are served under, i.e. the
+    URL /static/dist/css/main.0123456789ab.css
+ASSET_MAX_AGE
+    seconds a fingerprinted asset may be cached for: its name changes
+    with its content, so it never has to be revalidated
+ENCODINGS
+    the precompressed variants written next to each asset, in the order
+    they are preferred when the client accepts both
+COMPRESSIBLE
+    the file types worth precompressing; images and woff fonts already are
+'''
+ASSET_PREFIX = 'dist'
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+MANIFEST = 'manifest.json'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.ttf', '.otf', '.eot', '.txt', '.json')
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'"()?#]+)([^'"()]*)\1\s*\)''')
+
+'''
+BuildResult
+    the number of assets built and their total size, as is and in each of
+    ENCODINGS, in bytes
+'''
+BuildResult = namedtuple('BuildResult', ['assets', 'size', 'gzip_size', 'br_size'])
+
+
+def fingerprinted_name(name, data):
+    '''
+    fingerprinted_name(name, data)
+        name with the first 12 hex digits of the sha256 of data before its
+        extension: css/main.css -> css/main.0123456789ab.css
+    '''
+    root, ext = posixpath.splitext(name)
+    return '{}.{}{}'.format(root, hashlib.sha256(data).hexdigest()[:12], ext)
+
+
+def _sources(sources, target):
+    '''
+    {name: path} of every file under the (directory, prefix) sources, the
+    output directory left out. a later source wins over an earlier one.
+    '''
+    files = {}
+    target = os.path.realpath(target)
+    for directory, prefix in sources:
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) != target)
+            for filename in names:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                files[posixpath.join(prefix, name) if prefix else name] = path
+    return files
+
+
+def _rewrite_css(name, css, manifest):
+    '''
+    the stylesheet with every relative url() that points at a built asset
+    pointing at its fingerprinted name instead
+    '''
+    base = posixpath.dirname(name)
+
+    def fingerprint_url(match):
+        quote, url, suffix = match.groups()
+        if ':' in url or url.startswith('/'):
+            return match.group(0)
+        asset = manifest.get(posixpath.normpath(posixpath.join(base, url)))
+        if asset is None:
+            return match.group(0)
+        url = posixpath.join(posixpath.dirname(url), posixpath.basename(asset))
+        return 'url({0}{1}{2}{0})'.format(quote, url, suffix)
+
+    return CSS_URL.sub(fingerprint_url, css.decode('utf8')).encode('utf8')
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build_assets(sources, target):
+    '''
+    build_assets(sources, target)
+        copies every file of the (directory, URL prefix) sources into target
+        under its fingerprinted name, with .gz and, when the brotli package
+        is installed, .br copies of the compressible ones, and writes
+        target/manifest.json. stylesheets are built last so their url()s
+        can point at the fingerprinted fonts and images.
+    '''
+    files = _sources(sources, target)
+    names = sorted(files, key=lambda name: (name.endswith('.css'), name))
+    manifest = {}
+    encoded = {}
+    sizes = {'': 0, 'gzip': 0, 'br': 0}
+    for name in names:
+        with open(files[name], 'rb') as f:
+            data = f.read()
+        if name.endswith('.css'):
+            data = _rewrite_css(name, data, manifest)
+        asset = fingerprinted_name(name, data)
+        manifest[name] = asset
+        _write(os.path.join(target, asset), data)
+        sizes[''] += len(data)
+
+        if not name.endswith(COMPRESSIBLE):
+            continue
+        variants = {'gzip': gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=11)
+        for encoding, suffix in ENCODINGS:
+            # a variant that saves too little is not worth a second file
+            if encoding in variants and len(variants[encoding]) < len(data) * 0.9:
+                _write(os.path.join(target, asset + suffix), variants[encoding])
+                encoded.setdefault(asset, []).append(encoding)
+                sizes[encoding] += len(variants[encoding])
+
+    _write(os.path.join(target, MANIFEST),
+           json.dumps({'assets': manifest, 'encoded': encoded}, indent=1, sort_keys=True).encode('utf8'))
+    return BuildResult(len(manifest), sizes[''], sizes['gzip'], sizes['br'])
+
+
+class StaticAssets(object):
+    '''
+    StaticAssets
+        the manifest of the last build_assets(): url_for('static') gives the
+        fingerprinted URL of every asset in it, and those are served with
+        far-future immutable caching and, when the client accepts it, from
+        their precompressed copy. files missing from the manifest, and every
+        file when no build was made, are served by Flask as before.
+    '''
+
+    def __init__(self):
+        self.directory = None
+        self.assets = {}
+        self.encoded = {}
+        self.served = set()
+
+    def load(self, directory):
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        self.assets = {name: posixpath.join(ASSET_PREFIX, asset)
+                       for name, asset in manifest.get('assets', {}).items()}
+        self.encoded = {posixpath.join(ASSET_PREFIX, asset): encodings
+                        for asset, encodings in manifest.get('encoded', {}).items()}
+        self.served = set(self.assets.values())
+
+    def url_defaults(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.assets:
+            values['filename'] = self.assets[values['filename']]
+
+    def send_static_file(self, filename):
+        if filename not in self.served:
+            return current_app.send_static_file(filename)
+
+        path = os.path.join(self.directory, filename[len(ASSET_PREFIX) + 1:])
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encodings = self.encoded.get(filename, ())
+        for encoding, suffix in ENCODINGS:
+            if encoding in encodings and request.accept_encodings[encoding]:
+                response = send_file(path + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_file(path, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+'''
+static_assets
+    the assets of the running app, loaded by init_assets()
+'''
+static_assets = StaticAssets()
+
+
+def init_assets(app):
+    '''
+    init_assets(app)
+        loads the asset manifest from ASSET_DIRECTORY (static/dist by
+        default) and puts static_assets in front of the static route
+    '''
+    app.config.setdefault('ASSET_DIRECTORY', os.path.join(app.static_folder, ASSET_PREFIX))
+    app.config.setdefault('ASSET_SOURCES', [(app.static_folder, '')])
+    static_assets.load(app.config['ASSET_DIRECTORY'])
+    app.url_defaults(static_assets.url_defaults)
+    app.view_functions['static'] = static_assets.send_static_file
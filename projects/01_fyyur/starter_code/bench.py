@@ -0,0 +1,259 @@
+import asyncio
+import datetime
+import math
+import time
+import tracemalloc
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import event, func
+
+from models import db, Show, Artist, Venue, SHOW_DURATION
+from cache import render_cache
+from seed import SEED_BATCH
+
+'''
+BenchResult
+    one route's timings in milliseconds, the statements a single request
+    runs and the peak memory Python allocated while serving it
+'''
+BenchResult = namedtuple('BenchResult', ['route', 'p50_ms', 'p99_ms', 'queries', 'peak_kib'])
+
+'''
+DELETE_SHOW_COUNTS
+    the shows held by the venues bench_deletes() deletes, up to a venue
+    large enough for the cascade to dominate the request
+'''
+DELETE_SHOW_COUNTS = (10, 1000, 10000, 50000)
+
+
+def percentile(samples, pct):
+    '''
+    percentile(samples, pct)
+        nearest-rank percentile of a non-empty list of samples
+    '''
+    ordered = sorted(samples)
+    rank = max(int(math.ceil(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def bench_targets():
+    '''
+    bench_targets()
+        (name, method, path, form data) for every read route. the venue and
+        artist pages are benchmarked on the ones with the most shows, the
+        searches on the most common city.
+    '''
+    venue_id = db.session.query(Show.venue_id).group_by(Show.venue_id) \
+        .order_by(func.count(Show.id).desc(), Show.venue_id).limit(1).scalar() \
+        or db.session.query(func.min(Venue.id)).scalar()
+    artist_id = db.session.query(Show.artist_id).group_by(Show.artist_id) \
+        .order_by(func.count(Show.id).desc(), Show.artist_id).limit(1).scalar() \
+        or db.session.query(func.min(Artist.id)).scalar()
+    city = db.session.query(Venue.city).group_by(Venue.city) \
+        .order_by(func.count(Venue.id).desc(), Venue.city).limit(1).scalar() or ''
+    term = city.split(' ')[0]
+    return [
+        ('index', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('venues_json', 'GET', '/venues.json', None),
+        ('show_venue', 'GET', '/venues/{}'.format(venue_id), None),
+        ('search_venues', 'POST', '/venues/search', {'search_term': term}),
+        ('artists', 'GET', '/artists', None),
+        ('show_artist', 'GET', '/artists/{}'.format(artist_id), None),
+        ('search_artists', 'POST', '/artists/search', {'search_term': term}),
+        ('shows', 'GET', '/shows', None),
+        ('api_shows', 'GET', '/api/v1/shows', None),
+    ]
+
+
+def run_benchmarks(app, rounds=50, warmup=3, warm_cache=False, only=None):
+    '''
+    run_benchmarks(app, rounds, warmup, warm_cache, only)
+        drives every read route through the test client and returns a
+        BenchResult per route. the render cache is cleared before each
+        request unless warm_cache is set, so cached pages measure the
+        render rather than the cache hit.
+    '''
+    client = app.test_client()
+    results = []
+    for name, method, path, data in bench_targets():
+        if only and name not in only:
+            continue
+
+        def request():
+            if not warm_cache:
+                render_cache.clear()
+            response = client.open(path, method=method, data=data)
+            response.get_data()
+            if response.status_code >= 400:
+                raise RuntimeError('{} {} answered {}'.format(method, path, response.status_code))
+
+        for _ in range(warmup):
+            request()
+
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            request()
+            samples.append((time.perf_counter() - started) * 1000)
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            request()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+        tracemalloc.start()
+        try:
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results.append(BenchResult(name, round(percentile(samples, 50), 3), round(percentile(samples, 99), 3),
+                                   len(statements), round(peak / 1024.0, 1)))
+    return results
+
+
+def bench_deletes(app, show_counts=DELETE_SHOW_COUNTS):
+    '''
+    bench_deletes(app, show_counts)
+        times DELETE /venues/<id> for a throwaway venue holding each number
+        of shows and returns [(shows, ms, queries)]. the venues and the
+        artist created for it are removed again, also when a run fails.
+    '''
+    client = app.test_client()
+    results = []
+    now = datetime.datetime.now()
+    artist = Artist(name='Delete benchmark', city='Nowhere', genres=[])
+    db.session.add(artist)
+    db.session.commit()
+    artist_id = artist.id
+    venue_ids = []
+    try:
+        for count in show_counts:
+            venue = Venue(name='Delete benchmark', city='Nowhere', genres=[])
+            db.session.add(venue)
+            db.session.commit()
+            venue_ids.append(venue.id)
+            # back to back, so the benchmark's shows never overlap
+            for start in range(0, count, SEED_BATCH):
+                db.session.execute(Show.__table__.insert(), [
+                    {'venue_id': venue.id, 'artist_id': artist_id,
+                     'start_time': now + datetime.timedelta(minutes=SHOW_DURATION * i)}
+                    for i in range(start, min(start + SEED_BATCH, count))])
+            db.session.commit()
+
+            statements = []
+
+            def count_statement(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                started = time.perf_counter()
+                response = client.delete('/venues/{}'.format(venue.id))
+                elapsed = (time.perf_counter() - started) * 1000
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+            if response.status_code >= 400:
+                raise RuntimeError('DELETE /venues/{} answered {}'.format(venue.id, response.status_code))
+            results.append((count, round(elapsed, 3), len(statements)))
+    finally:
+        db.session.rollback()
+        # a venue whose run failed is still there, with its shows
+        db.session.query(Venue).filter(Venue.id.in_(venue_ids)).delete(synchronize_session=False)
+        db.session.query(Artist).filter(Artist.id == artist_id).delete(synchronize_session=False)
+        db.session.commit()
+    return results
+
+
+'''
+LoadResult
+    a load test against a running server: requests per second at a given
+    number of concurrent clients, latency percentiles in milliseconds and
+    the requests that failed
+'''
+LoadResult = namedtuple('LoadResult', ['concurrency', 'requests', 'rps', 'p50_ms', 'p99_ms', 'errors'])
+
+
+async def _http_request(reader, writer, host, method, path, data):
+    '''
+    one HTTP/1.1 request on a kept-alive connection; returns the status
+    and whether the server closed the connection after it
+    '''
+    body = urlencode(data).encode('ascii') if data else b''
+    head = '{} {} HTTP/1.1\r\nHost: {}\r\nContent-Length: {}\r\n'.format(method, path, host, len(body))
+    if body:
+        head += 'Content-Type: application/x-www-form-urlencoded\r\n'
+    writer.write(head.encode('latin1') + b'\r\n' + body)
+    version, status = (await reader.readline()).split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    keep_alive = headers.get('connection', '').lower()
+    closed = keep_alive == 'close' or (version == b'HTTP/1.0' and keep_alive != 'keep-alive')
+    return int(status), closed
+
+
+async def load_test(base_url, targets, concurrency=32, requests=1000, timeout=30):
+    '''
+    load_test(base_url, targets, concurrency, requests, timeout)
+        sends requests to a server started separately (the WSGI one or
+        `uvicorn asgi:asgi_app`) from concurrency kept-alive connections at
+        once, cycling through the (name, method, path, form data) targets,
+        and returns a LoadResult. the client is a bare asyncio one so that
+        it costs the machine little next to the server it measures.
+    '''
+    url = urlsplit(base_url)
+    port = url.port or 80
+    samples = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        connection = None
+        for i in remaining:
+            name, method, path, data = targets[i % len(targets)]
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(url.hostname, port)
+                status, closed = await asyncio.wait_for(
+                    _http_request(*connection, url.netloc, method, path, data), timeout)
+                failed = status >= 400
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                status, closed, failed = None, True, True
+            samples.append((time.perf_counter() - started) * 1000)
+            errors += failed
+            if closed and connection is not None:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    return LoadResult(concurrency, len(samples), round(len(samples) / elapsed, 1),
+                      round(percentile(samples, 50), 3), round(percentile(samples, 99), 3), errors)
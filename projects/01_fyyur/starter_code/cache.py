@@ -0,0 +1,116 @@
+import datetime
+import threading
+from collections import OrderedDict
+
+from flask import session
+
+from models import db, Show
+from routing import replica_expiry
+
+
+class RenderCache(object):
+    '''
+    RenderCache(max_entries, ttl)
+        an in-process LRU of rendered pages. an entry is dropped when it is
+        invalidated, evicted, or reaches its expiry, which is capped at ttl
+        seconds so writes made by other worker processes are picked up too.
+        values read from a replica are kept no longer than it may lag.
+    '''
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        if now is None:
+            now = datetime.datetime.now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body, expires_at=None, now=None):
+        if self.max_entries <= 0:
+            return
+        if now is None:
+            now = datetime.datetime.now()
+        latest = now + datetime.timedelta(seconds=self.ttl)
+        latest = min(latest, replica_expiry(now) or latest)
+        if expires_at is None or expires_at > latest:
+            expires_at = latest
+        with self._lock:
+            self._entries[key] = (body, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fetch(self, key, render):
+        '''
+        fetch(key, render)
+            returns the cached page for key, or calls render() -> (body, expires_at)
+            and caches the result. pages are neither served from nor stored in
+            the cache while flashed messages are waiting to be shown.
+        '''
+        if '_flashes' in session:
+            return render()[0]
+        body = self.get(key)
+        if body is None:
+            body, expires_at = render()
+            self.set(key, body, expires_at)
+        return body
+
+
+render_cache = RenderCache()
+
+
+def init_cache(app):
+    render_cache.max_entries = app.config.get('RENDER_CACHE_SIZE', 512)
+    render_cache.ttl = app.config.get('RENDER_CACHE_TTL', 300)
+
+
+def venue_key(venue_id):
+    return ('venue', int(venue_id))
+
+
+def artist_key(artist_id):
+    return ('artist', int(artist_id))
+
+
+def venue_page_keys(venue_id):
+    '''
+    venue_page_keys(venue_id)
+        cache keys that go stale when a venue changes: its own page and the
+        pages of every artist with a show there, which list its name and image.
+        collect them before committing and invalidate them after.
+    '''
+    artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return [venue_key(venue_id)] + [artist_key(row.artist_id) for row in artist_ids]
+
+
+def artist_page_keys(artist_id):
+    venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    return [artist_key(artist_id)] + [venue_key(row.venue_id) for row in venue_ids]
+
+
+def show_page_keys(venue_id, artist_id):
+    return [venue_key(venue_id), artist_key(artist_id)]
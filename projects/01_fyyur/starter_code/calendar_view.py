@@ -0,0 +1,102 @@
+import datetime
+
+import dateutil.parser
+from flask import abort
+from sqlalchemy import Date, cast, func
+
+from models import db, Show, Artist, Venue
+from facets import requested_genres, genre_filter
+
+CALENDAR_MAX_DAYS = 92
+CALENDAR_DEFAULT_DAYS = 7
+
+
+def calendar_window(args, today=None):
+    '''
+    calendar_window(args, today)
+        reads the [from, to) dates of a calendar request, or ?month=YYYY-MM
+        for a whole month, plus the city and genre filters. without dates
+        it is the week starting today. aborts with 400 when a date cannot
+        be parsed, to is not after from, or the window is longer than
+        CALENDAR_MAX_DAYS.
+    '''
+    if today is None:
+        today = datetime.date.today()
+    try:
+        if args.get('month'):
+            start = datetime.datetime.strptime(args['month'], '%Y-%m').date()
+            end = (start + datetime.timedelta(days=31)).replace(day=1)
+        else:
+            start = dateutil.parser.parse(args['from']).date() if args.get('from') else today
+            end = dateutil.parser.parse(args['to']).date() if args.get('to') \
+                else start + datetime.timedelta(days=CALENDAR_DEFAULT_DAYS)
+    except (ValueError, OverflowError):
+        abort(400)
+    if not start < end or (end - start).days > CALENDAR_MAX_DAYS:
+        abort(400)
+    return {
+        'start': start,
+        'end': end,
+        'city': args.get('city', '').strip() or None,
+        'genres': requested_genres(args),
+    }
+
+
+def _window(query, start, end, city=None, genres=()):
+    '''
+    the shows starting in [start, end), a range scan of ix_Show_start_time_id,
+    at venues in city and by artists playing every one of genres. the query
+    must already join Venue / Artist when filtering on them.
+    '''
+    query = query.filter(Show.start_time >= start, Show.start_time < end)
+    if city:
+        query = query.filter(Venue.city == city)
+    return genre_filter(query, Artist, genres)
+
+
+def calendar_shows(start, end, city=None, genres=()):
+    '''
+    calendar_shows(start, end, city, genres)
+        the shows of the window with their artist and venue, for paginate()
+    '''
+    query = db.session.query(
+        Show.id.label('show_id'),
+        Show.start_time.label('start_time'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.city.label('venue_city'),
+    ).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id)
+    return _window(query, start, end, city, genres)
+
+
+def day_counts(start, end, city=None, genres=()):
+    '''
+    day_counts(start, end, city, genres)
+        [(date, number of shows)] for every day of [start, end), days
+        without shows included, from a single GROUP BY query
+    '''
+    day = cast(Show.start_time, Date).label('day')
+    query = db.session.query(day, func.count()).select_from(Show)
+    if city:
+        query = query.join(Venue, Show.venue_id == Venue.id)
+    if genres:
+        query = query.join(Artist, Show.artist_id == Artist.id)
+    counts = dict(_window(query, start, end, city, genres).group_by(day).all())
+    return [(start + datetime.timedelta(days=i), counts.get(start + datetime.timedelta(days=i), 0))
+            for i in range((end - start).days)]
+
+
+def month_grid(days):
+    '''
+    month_grid(days)
+        day_counts() laid out in weeks from Monday to Sunday; the cells
+        before the first and after the last day are None
+    '''
+    if not days:
+        return []
+    cells = [None] * days[0][0].weekday() + list(days)
+    cells += [None] * (-len(cells) % 7)
+    return [cells[i:i + 7] for i in range(0, len(cells), 7)]
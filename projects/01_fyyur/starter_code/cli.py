@@ -0,0 +1,153 @@
+import json
+import asyncio
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from importer import import_file, BATCH_SIZE
+from seed import generate, truncate, SCALES
+from bench import run_benchmarks, bench_deletes, bench_targets, load_test, DELETE_SHOW_COUNTS
+from counters import rollover_counters, reconcile_counters
+from scheduling import show_conflicts
+from assets import build_assets
+
+'''
+fyyur_cli
+    the `flask fyyur ...` maintenance commands
+'''
+fyyur_cli = AppGroup('fyyur', help='Fyyur maintenance commands.')
+
+
+@fyyur_cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='File format, guessed from the extension by default.')
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True,
+              help='Rows inserted and committed per batch.')
+@click.option('--rejects', type=click.Path(dir_okay=False),
+              help='Where to write rejected rows, PATH.rejects.jsonl by default.')
+def import_command(kind, path, fmt, batch_size, rejects):
+    '''Stream venues, artists or shows from a CSV / JSONL file.
+
+    Shows reference their artist and venue by artist_id / venue_id, or by
+    artist_name / venue_name, optionally with artist_city / venue_city.
+    '''
+    result = import_file(kind, path, fmt=fmt, batch_size=batch_size, rejects=rejects)
+    click.echo('Imported {} {}, rejected {}.'.format(result.imported, kind, result.rejected))
+
+
+@fyyur_cli.command('seed')
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default='small', show_default=True,
+              help='Dataset size: 1k, 100k or 1M shows.')
+@click.option('--shows', type=int, help='Exact number of shows, overrides --scale.')
+@click.option('--seed', default=42, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--truncate', 'reset', is_flag=True, help='Empty the Show, Artist and Venue tables first.')
+def seed_command(scale, shows, seed, reset):
+    '''Generate synthetic venues, artists and shows for benchmarking.'''
+    if reset:
+        truncate()
+    result = generate(shows if shows is not None else SCALES[scale], seed=seed)
+    click.echo('Seeded {} venues, {} artists and {} shows.'.format(*result))
+
+
+@fyyur_cli.command('bench')
+@click.option('--rounds', default=50, show_default=True, help='Timed requests per route.')
+@click.option('--warmup', default=3, show_default=True, help='Untimed requests per route first.')
+@click.option('--warm-cache', is_flag=True, help='Keep the render cache between requests.')
+@click.option('--route', 'only', multiple=True, help='Only benchmark these routes (repeatable).')
+@click.option('--json', 'json_path', type=click.Path(dir_okay=False),
+              help='Also write the results to this file, to compare runs over time.')
+def bench_command(rounds, warmup, warm_cache, only, json_path):
+    '''Report p50 / p99 latency, query count and peak memory per route.'''
+    results = run_benchmarks(current_app, rounds=rounds, warmup=warmup, warm_cache=warm_cache, only=only)
+    click.echo('{:<16}{:>10}{:>10}{:>9}{:>12}'.format('route', 'p50 ms', 'p99 ms', 'queries', 'peak KiB'))
+    for result in results:
+        click.echo('{:<16}{:>10.2f}{:>10.2f}{:>9}{:>12.1f}'.format(*result))
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump([result._asdict() for result in results], f, indent=2)
+
+
+@fyyur_cli.command('bench-deletes')
+@click.option('--shows', 'show_counts', multiple=True, type=int, default=DELETE_SHOW_COUNTS, show_default=True,
+              help='Shows held by the deleted venue (repeatable).')
+def bench_deletes_command(show_counts):
+    '''Time venue deletes as the number of shows they cascade to grows.'''
+    click.echo('{:>8}{:>10}{:>9}'.format('shows', 'ms', 'queries'))
+    for result in bench_deletes(current_app, show_counts):
+        click.echo('{:>8}{:>10.2f}{:>9}'.format(*result))
+
+
+@fyyur_cli.command('loadtest')
+@click.argument('base_url')
+@click.option('--concurrency', 'levels', multiple=True, type=int, default=(1, 16, 64), show_default=True,
+              help='Concurrent clients (repeatable).')
+@click.option('--requests', default=1000, show_default=True, help='Requests per concurrency level.')
+@click.option('--route', 'only', multiple=True, help='Only request these routes (repeatable).')
+def loadtest_command(base_url, levels, requests, only):
+    '''Measure the throughput of a running server under concurrent load.
+
+    Start the server first, e.g. `gunicorn --threads 8 app:app` or
+    `uvicorn asgi:asgi_app`, and pass its URL.
+    '''
+    targets = [target for target in bench_targets() if not only or target[0] in only]
+    click.echo('{:>12}{:>10}{:>10}{:>10}{:>10}{:>8}'.format(
+        'concurrency', 'requests', 'req/s', 'p50 ms', 'p99 ms', 'errors'))
+    for level in levels:
+        result = asyncio.run(load_test(base_url, targets, concurrency=level, requests=requests))
+        click.echo('{:>12}{:>10}{:>10.1f}{:>10.2f}{:>10.2f}{:>8}'.format(*result))
+
+
+@fyyur_cli.command('assets')
+def assets_command():
+    '''Fingerprint and precompress the static assets.
+
+    Writes every file of ASSET_SOURCES to ASSET_DIRECTORY under a name
+    carrying a hash of its content, with .gz (and .br, when the brotli
+    package is installed) copies, plus the manifest url_for reads. Restart
+    the app after a build to serve the new names.
+    '''
+    result = build_assets(current_app.config['ASSET_SOURCES'], current_app.config['ASSET_DIRECTORY'])
+    click.echo('Built {} assets into {}: {:.1f} KiB, {:.1f} KiB gzip, {:.1f} KiB brotli.'.format(
+        result.assets, current_app.config['ASSET_DIRECTORY'],
+        result.size / 1024, result.gzip_size / 1024, result.br_size / 1024))
+
+
+@fyyur_cli.command('rollover')
+def rollover_command():
+    '''Move shows that have started from upcoming to past.
+
+    Run it every few minutes (e.g. from cron) to keep the venue and artist
+    show counters current.
+    '''
+    click.echo('Rolled over {} venues and artists.'.format(rollover_counters()))
+
+
+@fyyur_cli.command('reconcile')
+@click.option('--check', is_flag=True, help='Only report drift, do not repair it.')
+def reconcile_command(check):
+    '''Recount the venue and artist show counters and repair drift.'''
+    drift = reconcile_counters(repair=not check)
+    click.echo('{} {} venues and {} artists.'.format(
+        'Found drift on' if check else 'Repaired', drift['venues'], drift['artists']))
+    if check and any(drift.values()):
+        raise SystemExit(1)
+
+
+@fyyur_cli.command('conflicts')
+def conflicts_command():
+    '''List the shows that overlap another show of their venue or artist.
+
+    Exits with status 1 when there are any, so it can gate a deploy.
+    '''
+    found = 0
+    for conflict in show_conflicts():
+        found += 1
+        click.echo('{} {}: show {} at {:%Y-%m-%d %H:%M} overlaps show {} at {:%Y-%m-%d %H:%M}'.format(
+            conflict.kind, conflict.owner_id, conflict.show_id, conflict.start_time,
+            conflict.other_id, conflict.other_start_time))
+    click.echo('Found {} overlapping {}.'.format(found, 'pair' if found == 1 else 'pairs'))
+    if found:
+        raise SystemExit(1)
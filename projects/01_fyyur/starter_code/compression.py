@@ -0,0 +1,304 @@
+import itertools
+import os
+import threading
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+'''
+COMPRESS_MIN_SIZE
+    bodies smaller than this many bytes are sent as they are: below about
+    a packet, compressing saves nothing on the wire
+COMPRESS_MIMETYPES
+    the content types worth compressing; images, fonts and archives
+    already are
+GZIP_LEVEL, BROTLI_QUALITY
+    per-response effort. both are the usual settings for dynamic content:
+    most of the ratio of the maximum for a fraction of the CPU.
+'''
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_MIMETYPES = frozenset([
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'text/xml',
+    'application/json', 'application/javascript', 'application/x-ndjson', 'application/xml',
+    'image/svg+xml',
+])
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def accepted_encoding(header, available):
+    '''
+    accepted_encoding(header, available)
+        the first of available that the Accept-Encoding header accepts with
+        the highest quality, or None for identity
+    '''
+    qualities = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    best = None
+    for encoding in available:
+        q = qualities.get(encoding, qualities.get('*', 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+
+class GzipCompressor(object):
+
+    def __init__(self, level=GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(object):
+
+    def __init__(self, quality=BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+'''
+COMPRESSORS
+    the encodings the middleware can produce, in order of preference
+'''
+COMPRESSORS = [('br', BrotliCompressor)] if brotli is not None else []
+COMPRESSORS.append(('gzip', GzipCompressor))
+
+
+class CompressionStats(object):
+    '''
+    CompressionStats()
+        compression counters for this worker process: responses compressed
+        per encoding and skipped per reason, bytes before and after, and
+        the CPU time spent compressing
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.compressed = {}
+            self.skipped = {}
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.cpu_time = 0.0
+
+    def skip(self, reason):
+        with self._lock:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_time):
+        with self._lock:
+            self.compressed[encoding] = self.compressed.get(encoding, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_time += cpu_time
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'compressed': dict(self.compressed),
+                'skipped': dict(self.skipped),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': round(self.bytes_in / self.bytes_out, 3) if self.bytes_out else 0.0,
+                'cpu_ms': round(self.cpu_time * 1000, 3),
+                'cpu_ms_per_mib': round(self.cpu_time * 1000 * 1048576 / self.bytes_in, 3) if self.bytes_in else 0.0,
+            }
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware(object):
+    '''
+    CompressionMiddleware(app, min_size, mimetypes, stats)
+        WSGI middleware compressing the responses of app with the best
+        encoding the client accepts (brotli when the brotli package is
+        installed, else gzip). bodies of min_size bytes or more whose
+        content type is in mimetypes are compressed; responses that are
+        already encoded, partial, or marked no-transform are not.
+
+        streamed bodies are compressed chunk by chunk, each flushed as it
+        arrives, so they keep streaming. the headers wait until min_size
+        bytes or the end of the body, whichever comes first, when the app
+        gives no Content-Length.
+    '''
+
+    def __init__(self, app, min_size=COMPRESS_MIN_SIZE, mimetypes=COMPRESS_MIMETYPES, stats=None):
+        self.app = app
+        self.min_size = min_size
+        self.mimetypes = mimetypes
+        self.stats = stats if stats is not None else CompressionStats()
+
+    def __call__(self, environ, start_response):
+        return self.respond(self.app, environ, start_response)
+
+    def respond(self, app, environ, start_response):
+        '''
+        respond(app, environ, start_response)
+            calls the WSGI app through the middleware, for a caller that
+            has to wrap an app of its own, such as asgi.py
+        '''
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return app(environ, start_response)
+        encoding = accepted_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''),
+                                     [name for name, _ in COMPRESSORS])
+
+        response = {}
+
+        def capture(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            reason = self.reason_to_skip(status, headers)
+            if reason is None:
+                # compressible, so caches must key it on Accept-Encoding
+                headers = [(key, value) for key, value in headers if key.lower() != 'vary'] + \
+                    [('Vary', self.vary(_header(headers, 'vary')))]
+                if encoding is None:
+                    reason = 'not accepted'
+            response.update(status=status, headers=headers, skip=reason)
+            if reason is not None:
+                self.stats.skip(reason)
+                response['started'] = True
+                return start_response(status, headers, exc_info)
+            response['exc_info'] = exc_info
+            return response.setdefault('buffer', []).append
+
+        body = app(environ, capture)
+        if response.get('skip') is not None:
+            return body
+        return self.compressed(body, encoding, response, start_response)
+
+    def reason_to_skip(self, status, headers):
+        code = int(status.split(None, 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return 'status'
+        mimetype = (_header(headers, 'content-type') or '').split(';')[0].strip().lower()
+        if mimetype not in self.mimetypes:
+            return 'content type'
+        if _header(headers, 'content-encoding') or _header(headers, 'content-range'):
+            return 'encoded'
+        if 'no-transform' in (_header(headers, 'cache-control') or '').lower():
+            return 'no-transform'
+        length = _header(headers, 'content-length')
+        if length is not None and int(length) < self.min_size:
+            return 'too small'
+        return None
+
+    def vary(self, vary):
+        if vary is None:
+            return 'Accept-Encoding'
+        if 'accept-encoding' in [value.strip().lower() for value in vary.split(',')]:
+            return vary
+        return vary + ', Accept-Encoding'
+
+    def compressed(self, body, encoding, response, start_response):
+        iterator = iter(body)
+        try:
+            pending = []
+            if 'status' not in response:
+                # a generator app only calls start_response once iterated
+                pending.extend(itertools.islice(iterator, 1))
+                if response.get('skip') is not None:
+                    for chunk in itertools.chain(pending, iterator):
+                        yield chunk
+                    return
+
+            # hold the headers until the body is known to be worth it
+            pending = list(response.get('buffer', ())) + pending
+            size = sum(len(chunk) for chunk in pending)
+            done = False
+            while size < self.min_size:
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    done = True
+                    break
+                pending.append(chunk)
+                size += len(chunk)
+
+            headers = response['headers']
+            if done and size < self.min_size:
+                self.stats.skip('too small')
+                start_response(response['status'], headers, response['exc_info'])
+                for chunk in pending:
+                    yield chunk
+                return
+
+            headers = [(key, value) for key, value in headers if key.lower() != 'content-length'] + \
+                [('Content-Encoding', encoding)]
+            etag = _header(headers, 'etag')
+            if etag is not None and not etag.startswith('W/'):
+                # the compressed bytes differ, so the tag can only be weak
+                headers = [(key, value) for key, value in headers if key.lower() != 'etag'] + \
+                    [('ETag', 'W/' + etag)]
+            start_response(response['status'], headers, response['exc_info'])
+
+            compressor = dict(COMPRESSORS)[encoding]()
+            bytes_in = bytes_out = 0
+            cpu_time = 0.0
+            for chunk in itertools.chain([b''.join(pending)], iterator):
+                if not chunk:
+                    continue
+                started = time.thread_time()
+                data = compressor.compress(chunk)
+                cpu_time += time.thread_time() - started
+                bytes_in += len(chunk)
+                bytes_out += len(data)
+                if data:
+                    yield data
+            started = time.thread_time()
+            data = compressor.finish()
+            cpu_time += time.thread_time() - started
+            bytes_out += len(data)
+            self.stats.record(encoding, bytes_in, bytes_out, cpu_time)
+            if data:
+                yield data
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+
+
+def init_compression(app, **options):
+    '''
+    init_compression(app, min_size, mimetypes, stats)
+        wraps the Flask app's wsgi_app in a CompressionMiddleware, kept in
+        app.extensions['compression'] for its stats
+    '''
+    app.wsgi_app = app.extensions['compression'] = CompressionMiddleware(app.wsgi_app, **options)
+    return app.wsgi_app
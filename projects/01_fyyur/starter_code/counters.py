@@ -0,0 +1,97 @@
+import datetime
+
+from sqlalchemy import func, or_, select, update
+
+from models import db, Show, Artist, Venue
+
+'''
+OWNERS
+    the Show foreign key each counted model owns its shows through
+'''
+OWNERS = {
+    Venue: Show.venue_id,
+    Artist: Show.artist_id,
+}
+
+
+def _now(now):
+    return datetime.datetime.now() if now is None else now
+
+
+def true_counts(model, now):
+    '''
+    true_counts(model, now)
+        (upcoming_shows_count, past_shows_count, next_show_at) of each model
+        row as correlated subqueries over the (owner, start_time) index
+    '''
+    owner = OWNERS[model]
+    table = model.__table__
+
+    def shows(column, *criteria):
+        return select(column).where(owner == table.c.id, *criteria).scalar_subquery()
+
+    return {
+        'upcoming_shows_count': shows(func.count(), Show.start_time >= now),
+        'past_shows_count': shows(func.count(), Show.start_time < now),
+        'next_show_at': shows(func.min(Show.start_time), Show.start_time >= now),
+    }
+
+
+def _drifted(model, counts):
+    table = model.__table__
+    return or_(*[table.c[column].is_distinct_from(value) for column, value in counts.items()])
+
+
+def refresh_counters(model, ids=None, now=None, where=None):
+    '''
+    refresh_counters(model, ids, now, where)
+        recounts the rows with the given ids, or matching where, in the
+        current transaction. returns how many rows had drifted. updated_at
+        is left alone: a counter moving does not change the row's content.
+    '''
+    table = model.__table__
+    counts = true_counts(model, _now(now))
+    stmt = update(table).values(updated_at=table.c.updated_at, **counts).where(_drifted(model, counts))
+    if ids is not None:
+        ids = {int(id) for id in ids}
+        if not ids:
+            return 0
+        stmt = stmt.where(table.c.id.in_(ids))
+    if where is not None:
+        stmt = stmt.where(where)
+    return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def rollover_counters(now=None):
+    '''
+    rollover_counters(now)
+        moves shows that have started since the last run from upcoming to
+        past. only venues and artists whose next_show_at has passed are
+        touched, found through the next_show_at index. returns how many
+        rows changed.
+    '''
+    now = _now(now)
+    changed = 0
+    for model in OWNERS:
+        changed += refresh_counters(model, now=now, where=model.next_show_at <= now)
+    db.session.commit()
+    return changed
+
+
+def reconcile_counters(now=None, repair=True):
+    '''
+    reconcile_counters(now, repair)
+        compares every counter with a recount from Show, returning
+        {'venues': drifted rows, 'artists': drifted rows}. drift is repaired
+        unless repair is False.
+    '''
+    now = _now(now)
+    drift = {}
+    for model, name in ((Venue, 'venues'), (Artist, 'artists')):
+        if repair:
+            drift[name] = refresh_counters(model, now=now)
+        else:
+            drift[name] = db.session.query(func.count(model.id)) \
+                .filter(_drifted(model, true_counts(model, now))).scalar()
+    db.session.commit()
+    return drift
@@ -0,0 +1,38 @@
+from models import db, Artist, Venue
+from cache import render_cache, venue_key, artist_key
+from counters import OWNERS, refresh_counters
+from facets import invalidate_facets
+
+'''
+COUNTERPARTS
+    the model on the other side of a Show from each deletable model
+'''
+COUNTERPARTS = {
+    Venue: (Artist, venue_key, artist_key),
+    Artist: (Venue, artist_key, venue_key),
+}
+
+
+def delete_rows(model, ids):
+    '''
+    delete_rows(model, ids)
+        deletes venues or artists with one DELETE statement; their shows go
+        with them through the ON DELETE CASCADE foreign keys, without being
+        loaded into the session. the counters and cached pages of the
+        venues / artists they were booked with are refreshed. returns how
+        many rows were deleted.
+    '''
+    ids = {int(id) for id in ids}
+    if not ids:
+        return 0
+    counterpart, own_key, counterpart_key = COUNTERPARTS[model]
+    counterpart_ids = [row[0] for row in db.session.query(OWNERS[counterpart])
+                       .filter(OWNERS[model].in_(ids)).distinct()]
+
+    deleted = db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+    refresh_counters(counterpart, counterpart_ids)
+    db.session.commit()
+
+    render_cache.invalidate(*[own_key(id) for id in ids] + [counterpart_key(id) for id in counterpart_ids])
+    invalidate_facets(model)
+    return deleted
@@ -0,0 +1,65 @@
+from sqlalchemy import func
+
+from models import db, Venue
+from facets import genre_filter
+from pagination import paginate
+
+'''
+AREA_ORDER
+    the order of the venue directory, keyset paginated through ix_Venue_area:
+    the venues of one area (city, state) are contiguous, so a page only ever
+    splits the areas at its two ends. state is nullable and a NULL drops out
+    of the keyset row comparison, so it sorts as ''.
+'''
+AREA_ORDER = [Venue.city, func.coalesce(Venue.state, ''), Venue.name, Venue.id]
+
+
+def area_key(row):
+    return (row.city, row.state or '', row.name, row.id)
+
+
+def venue_rows():
+    '''
+    venue_rows()
+        query of every venue with its number of upcoming shows, read from
+        the counter kept on the venue row (see counters.py)
+    '''
+    return db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.upcoming_shows_count.label('num_upcoming_shows'),
+    )
+
+
+def group_by_area(rows):
+    '''
+    group_by_area(rows)
+        folds venue rows, in AREA_ORDER, into a list shaped like
+        [{'city', 'state', 'venues': [{'id', 'name', 'num_upcoming_shows'}]}]
+        keeping the row order
+    '''
+    areas = {}
+    for row in rows:
+        area = areas.get((row.city, row.state))
+        if area is None:
+            area = areas[(row.city, row.state)] = {
+                'city': row.city, 'state': row.state, 'venues': []}
+        area['venues'].append({
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.num_upcoming_shows,
+        })
+    return list(areas.values())
+
+
+def venue_directory(genres=(), after=None, before=None):
+    '''
+    venue_directory(genres, after, before)
+        one page of the venues with any of genres, in AREA_ORDER, as
+        (areas grouped by group_by_area, Page)
+    '''
+    page = paginate(genre_filter(venue_rows(), Venue, genres), AREA_ORDER, area_key,
+                    after=after, before=before)
+    return group_by_area(page.items), page
@@ -0,0 +1,68 @@
+from sqlalchemy import update
+
+from models import db, Artist, Venue
+
+'''
+EDITABLE
+    the columns the edit forms may change, per model
+'''
+EDITABLE = {
+    Venue: ['name', 'city', 'state', 'address', 'phone', 'image_link', 'genres', 'facebook_link'],
+    Artist: ['name', 'city', 'state', 'phone', 'image_link', 'genres', 'facebook_link'],
+}
+
+
+class EditConflict(Exception):
+    '''
+    EditConflict(current)
+        the row was changed by someone else since the editor loaded it;
+        current holds the row as it is now
+    '''
+
+    def __init__(self, current):
+        super(EditConflict, self).__init__('row was changed concurrently')
+        self.current = current
+
+
+def edited_values(model, form):
+    '''
+    edited_values(model, form)
+        the EDITABLE values submitted in a request form
+    '''
+    return {column: form.getlist(column) if column == 'genres' else form.get(column)
+            for column in EDITABLE[model]}
+
+
+def update_row(model, id, version, values):
+    '''
+    update_row(model, id, version, values)
+        writes the values that differ from the stored row with one UPDATE,
+        guarded by the version the editor started from, and bumps the
+        version. returns the changed column names (empty when nothing
+        changed, None when the row does not exist) and raises EditConflict
+        when the row moved on since version.
+    '''
+    table = model.__table__
+    columns = EDITABLE[model]
+    current = db.session.query(*[table.c[column] for column in ['id', 'version'] + columns]) \
+        .filter(table.c.id == id).first()
+    if current is None:
+        return None
+    if current.version != version:
+        raise EditConflict(current)
+
+    changed = {column: values[column] for column in columns
+               if column in values and (values[column] or None) != (getattr(current, column) or None)}
+    if not changed:
+        return []
+
+    result = db.session.execute(
+        update(table)
+        .where(table.c.id == id, table.c.version == version)
+        .values(version=table.c.version + 1, **changed))
+    if result.rowcount != 1:
+        db.session.rollback()
+        raise EditConflict(db.session.query(*[table.c[column] for column in ['id', 'version'] + columns])
+                           .filter(table.c.id == id).first())
+    db.session.commit()
+    return sorted(changed)
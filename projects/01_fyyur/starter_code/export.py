@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+
+import dateutil.parser
+from flask import abort
+
+from models import db, Show, Artist, Venue
+
+EXPORT_BATCH = 1000
+
+EXPORT_COLUMNS = [
+    'show_id', 'start_time',
+    'artist_id', 'artist_name',
+    'venue_id', 'venue_name', 'venue_city', 'venue_state',
+]
+
+
+def export_filters(args):
+    '''
+    export_filters(args)
+        reads the from / to / city / venue_id query string filters,
+        aborting with 400 when one cannot be parsed
+    '''
+    filters = {}
+    try:
+        if args.get('from'):
+            filters['start'] = dateutil.parser.parse(args['from'])
+        if args.get('to'):
+            filters['end'] = dateutil.parser.parse(args['to'])
+        if args.get('venue_id'):
+            filters['venue_id'] = int(args['venue_id'])
+    except (ValueError, OverflowError):
+        abort(400)
+    if args.get('city'):
+        filters['city'] = args['city']
+    return filters
+
+
+def export_rows(start=None, end=None, city=None, venue_id=None):
+    '''
+    export_rows(start, end, city, venue_id)
+        shows in [start, end) ordered by start_time, read through a
+        server-side cursor EXPORT_BATCH rows at a time
+    '''
+    query = db.session.query(
+        Show.id.label('show_id'),
+        Show.start_time.label('start_time'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.city.label('venue_city'),
+        Venue.state.label('venue_state'),
+    ).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id)
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    if city is not None:
+        query = query.filter(Venue.city == city)
+    if venue_id is not None:
+        query = query.filter(Show.venue_id == venue_id)
+    return query.order_by(Show.start_time, Show.id) \
+        .execution_options(stream_results=True).yield_per(EXPORT_BATCH)
+
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def export_csv(rows):
+    '''
+    export_csv(rows)
+        yields the export as CSV text, one chunk per EXPORT_BATCH rows
+    '''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_serialize(value) for value in row])
+        if count % EXPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_jsonl(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps({column: _serialize(value)
+                                 for column, value in zip(EXPORT_COLUMNS, row)}))
+        if len(chunk) == EXPORT_BATCH:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
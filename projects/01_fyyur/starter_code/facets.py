@@ -0,0 +1,60 @@
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from models import db, Artist, Venue
+from cache import RenderCache
+
+'''
+facet_caches
+    genre facet counts per model, keyed by the selected genres. a model's
+    cache is cleared whenever one of its rows is created, edited or
+    deleted; the ttl bounds how stale other workers' writes leave it.
+'''
+facet_caches = {
+    Venue: RenderCache(max_entries=256, ttl=300),
+    Artist: RenderCache(max_entries=256, ttl=300),
+}
+
+
+def requested_genres(args):
+    '''
+    requested_genres(args)
+        the distinct ?genre= values of a request, sorted
+    '''
+    return sorted({genre.strip() for genre in args.getlist('genre') if genre.strip()})
+
+
+def genre_filter(query, model, genres):
+    '''
+    genre_filter(query, model, genres)
+        keeps the rows tagged with every one of genres. `genres @> ARRAY[...]`
+        is answered from the GIN index on the genres column.
+    '''
+    if genres:
+        query = query.filter(model.genres.op('@>')(cast(genres, ARRAY(model.genres.type.item_type))))
+    return query
+
+
+def genre_facets(model, genres=()):
+    '''
+    genre_facets(model, genres)
+        [(genre, count)] over the rows matching the selected genres, most
+        common first. served from facet_caches when possible.
+    '''
+    genres = sorted(genres)
+    cache = facet_caches[model]
+    key = tuple(genres)
+    facets = cache.get(key)
+    if facets is None:
+        tags = genre_filter(db.session.query(func.unnest(model.genres).label('genre')),
+                            model, genres).subquery()
+        count = func.count().label('count')
+        facets = [(row.genre, row.count) for row in db.session.query(tags.c.genre, count)
+                  .group_by(tags.c.genre).order_by(count.desc(), tags.c.genre)]
+        cache.set(key, facets)
+    return facets
+
+
+def invalidate_facets(*models):
+    for model in models:
+        facet_caches[model].clear()
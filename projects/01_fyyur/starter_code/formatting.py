@@ -0,0 +1,60 @@
+import datetime
+import functools
+
+import babel
+import babel.dates
+import dateutil.parser
+
+'''
+DATETIME_FORMATS
+    the named formats the datetime filter accepts; any other format is
+    used as a Babel pattern as is
+'''
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@functools.lru_cache(maxsize=64)
+def datetime_formatter(format='medium', locale=None):
+    '''
+    datetime_formatter(format, locale)
+        a function formatting one datetime. the Babel pattern and locale
+        are compiled once per (format, locale) and reused afterwards.
+    '''
+    pattern = babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+    locale = babel.Locale.parse(locale or babel.dates.LC_TIME)
+
+    def formatter(value):
+        if not isinstance(value, datetime.datetime):
+            value = dateutil.parser.parse(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return pattern.apply(value, locale)
+    return formatter
+
+
+def format_datetime(value, format='medium', locale=None):
+    '''
+    format_datetime(value, format, locale)
+        formats a datetime, or a string holding one, for display. datetimes
+        are not re-parsed.
+    '''
+    return datetime_formatter(format, locale)(value)
+
+
+def format_datetimes(values, format='medium', locale=None):
+    '''
+    format_datetimes(values, format, locale)
+        formats a whole list of show times at once, looking the formatter up
+        a single time and formatting each distinct value only once
+    '''
+    formatter = datetime_formatter(format, locale)
+    formatted = {}
+    results = []
+    for value in values:
+        if value not in formatted:
+            formatted[value] = formatter(value)
+        results.append(formatted[value])
+    return results
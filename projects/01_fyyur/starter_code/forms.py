@@ -1,7 +1,9 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, IntegerField, TextAreaField, HiddenField
+from wtforms.validators import DataRequired, AnyOf, URL, Optional, NumberRange
+from models import SHOW_DURATION
+from scheduling import MAX_SHOW_DURATION
 
 
 class ShowForm(Form):
@@ -16,9 +18,50 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    duration = IntegerField(
+        'duration', validators=[Optional(), NumberRange(min=1, max=MAX_SHOW_DURATION)],
+        default=SHOW_DURATION
+    )
+
+
+class ShowBatchForm(Form):
+    artist_id = StringField(
+        'artist_id', validators=[DataRequired()]
+    )
+    venue_id = StringField(
+        'venue_id', validators=[DataRequired()]
+    )
+    start_time = DateTimeField(
+        'start_time',
+        validators=[Optional()],
+        default=datetime.today()
+    )
+    recurrence = SelectField(
+        'recurrence', default='',
+        choices=[
+            ('', 'Does not repeat'),
+            ('daily', 'Daily'),
+            ('weekly', 'Weekly'),
+            ('biweekly', 'Every two weeks'),
+            ('monthly', 'Monthly'),
+        ]
+    )
+    occurrences = IntegerField(
+        'occurrences', validators=[Optional(), NumberRange(min=1)]
+    )
+    start_times = TextAreaField(
+        'start_times'
+    )
+    duration = IntegerField(
+        'duration', validators=[Optional(), NumberRange(min=1, max=MAX_SHOW_DURATION)],
+        default=SHOW_DURATION
+    )
 
 
 class VenueForm(Form):
+    version = HiddenField(
+        'version'
+    )
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -121,6 +164,9 @@ class VenueForm(Form):
 
 
 class ArtistForm(Form):
+    version = HiddenField(
+        'version'
+    )
     name = StringField(
         'name', validators=[DataRequired()]
     )
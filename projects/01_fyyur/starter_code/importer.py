@@ -0,0 +1,321 @@
+import csv
+import datetime
+import json
+from collections import namedtuple
+
+import dateutil.parser
+from sqlalchemy.exc import DataError, IntegrityError
+
+from models import db, Show, Artist, Venue, SHOW_DURATION
+from counters import refresh_counters
+from scheduling import booked_slots, naive_local
+
+BATCH_SIZE = 1000
+
+'''
+ImportResult
+    how many rows of a file were inserted and how many were rejected
+'''
+ImportResult = namedtuple('ImportResult', ['imported', 'rejected'])
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path, fmt):
+    '''
+    read_rows(path, fmt)
+        streams (line number, row dict) pairs from a csv or jsonl file
+    '''
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_num, RowError('invalid JSON: {}'.format(e))
+                    continue
+                yield line_num, row
+
+
+def _text(raw, field, required=False, model=None):
+    '''
+    the stripped text of field, checked against the length of the column
+    of the same name when model is given
+    '''
+    value = raw.get(field)
+    if isinstance(value, str):
+        value = value.strip()
+    if value in (None, ''):
+        if required:
+            raise RowError('{} is required'.format(field))
+        return None
+    value = str(value)
+    length = getattr(model.__table__.c[field].type, 'length', None) if model is not None else None
+    if length is not None and len(value) > length:
+        raise RowError('{} is longer than {} characters'.format(field, length))
+    return value
+
+
+def _genres(raw):
+    value = raw.get('genres')
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list):
+        raise RowError('genres must be a list')
+    return [str(genre).strip() for genre in value if str(genre).strip()]
+
+
+def _int(raw, field):
+    value = raw.get(field)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError('{} must be an integer'.format(field))
+
+
+def parse_venue(raw):
+    return {
+        'name': _text(raw, 'name', required=True, model=Venue),
+        'city': _text(raw, 'city', required=True, model=Venue),
+        'state': _text(raw, 'state', model=Venue),
+        'address': _text(raw, 'address', model=Venue),
+        'phone': _text(raw, 'phone', model=Venue),
+        'image_link': _text(raw, 'image_link', model=Venue),
+        'facebook_link': _text(raw, 'facebook_link', model=Venue),
+        'genres': _genres(raw),
+    }
+
+
+def parse_artist(raw):
+    return {
+        'name': _text(raw, 'name', required=True, model=Artist),
+        'city': _text(raw, 'city', required=True, model=Artist),
+        'state': _text(raw, 'state', model=Artist),
+        'phone': _text(raw, 'phone', model=Artist),
+        'image_link': _text(raw, 'image_link', model=Artist),
+        'facebook_link': _text(raw, 'facebook_link', model=Artist),
+        'genres': _genres(raw),
+    }
+
+
+def _reference(raw, kind):
+    '''
+    a show points at its artist / venue either by <kind>_id or by the
+    natural key <kind>_name, optionally narrowed down by <kind>_city
+    '''
+    ref_id = _int(raw, kind + '_id')
+    if ref_id is not None:
+        return ('id', ref_id)
+    name = _text(raw, kind + '_name')
+    if name is None:
+        raise RowError('{0}_id or {0}_name is required'.format(kind))
+    return ('name', name, _text(raw, kind + '_city'))
+
+
+def parse_show(raw):
+    start_time = _text(raw, 'start_time', required=True)
+    try:
+        start_time = dateutil.parser.parse(start_time)
+    except (ValueError, OverflowError):
+        raise RowError('start_time is not a date: {}'.format(start_time))
+    return {
+        'start_time': naive_local(start_time),
+        'artist': _reference(raw, 'artist'),
+        'venue': _reference(raw, 'venue'),
+    }
+
+
+def _resolver(model, refs):
+    '''
+    looks every reference of one batch up with a single query per kind,
+    returning ref -> id, or ref -> RowError when it is unknown or ambiguous
+    '''
+    ids = {ref[1] for ref in refs if ref[0] == 'id'}
+    names = {ref[1] for ref in refs if ref[0] == 'name'}
+    found_ids = set()
+    by_name = {}
+    if ids:
+        found_ids = {row.id for row in db.session.query(model.id).filter(model.id.in_(ids))}
+    if names:
+        for row in db.session.query(model.id, model.name, model.city).filter(model.name.in_(names)):
+            by_name.setdefault(row.name, []).append(row)
+
+    label = model.__tablename__.lower()
+    resolved = {}
+    for ref in refs:
+        if ref[0] == 'id':
+            resolved[ref] = ref[1] if ref[1] in found_ids \
+                else RowError('unknown {} id {}'.format(label, ref[1]))
+            continue
+        candidates = [row for row in by_name.get(ref[1], [])
+                      if ref[2] is None or row.city == ref[2]]
+        if len(candidates) == 1:
+            resolved[ref] = candidates[0].id
+        elif candidates:
+            resolved[ref] = RowError('ambiguous {} {!r}, add {}_city'.format(label, ref[1], label))
+        else:
+            resolved[ref] = RowError('unknown {} {!r}'.format(label, ref[1]))
+    return resolved
+
+
+def resolve_shows(batch):
+    '''
+    resolve_shows(batch)
+        swaps the artist / venue references of parsed shows for ids, and
+        rejects the shows overlapping another of their venue or artist:
+        one in the database, earlier batches included, or one of the batch.
+        returns ([(line number, raw row, row ready to insert)],
+        [(line number, raw row, RowError)])
+    '''
+    artists = _resolver(Artist, {show['artist'] for _, _, show in batch})
+    venues = _resolver(Venue, {show['venue'] for _, _, show in batch})
+    resolved = []
+    rejected = []
+    for line_num, raw, show in batch:
+        artist_id = artists[show['artist']]
+        venue_id = venues[show['venue']]
+        error = next((ref for ref in (artist_id, venue_id) if isinstance(ref, RowError)), None)
+        if error is not None:
+            rejected.append((line_num, raw, error))
+            continue
+        resolved.append((line_num, raw, {'artist_id': artist_id, 'venue_id': venue_id,
+                                         'start_time': show['start_time']}))
+    if not resolved:
+        return resolved, rejected
+
+    booked = booked_slots([(row['venue_id'], row['artist_id'], row['start_time'])
+                           for _, _, row in resolved], SHOW_DURATION)
+    # the batch against itself, in start order as in schedule_shows: a show
+    # overlaps an earlier one of its venue / artist when it starts before
+    # the end of the last one kept
+    length = datetime.timedelta(minutes=SHOW_DURATION)
+    venue_ends = {}
+    artist_ends = {}
+    rows = []
+    for line_num, raw, row in sorted(resolved, key=lambda entry: (entry[2]['start_time'], entry[0])):
+        reason = booked.get((row['venue_id'], row['artist_id'], row['start_time']))
+        if reason is None and row['start_time'] < venue_ends.get(row['venue_id'], datetime.datetime.min):
+            reason = 'the venue has another show of this file then'
+        if reason is None and row['start_time'] < artist_ends.get(row['artist_id'], datetime.datetime.min):
+            reason = 'the artist has another show of this file then'
+        if reason is not None:
+            rejected.append((line_num, raw, RowError(reason)))
+            continue
+        venue_ends[row['venue_id']] = artist_ends[row['artist_id']] = row['start_time'] + length
+        rows.append((line_num, raw, row))
+    rows.sort(key=lambda entry: entry[0])
+    rejected.sort(key=lambda entry: entry[0])
+    return rows, rejected
+
+
+def count_shows(rows):
+    '''
+    count_shows(rows)
+        recounts the venues and artists of a batch of inserted shows
+    '''
+    refresh_counters(Venue, {row['venue_id'] for row in rows})
+    refresh_counters(Artist, {row['artist_id'] for row in rows})
+
+
+IMPORTERS = {
+    'venues': (Venue, parse_venue, None, None),
+    'artists': (Artist, parse_artist, None, None),
+    'shows': (Show, parse_show, resolve_shows, count_shows),
+}
+
+
+def import_file(kind, path, fmt=None, batch_size=BATCH_SIZE, rejects=None):
+    '''
+    import_file(kind, path, fmt, batch_size, rejects)
+        streams venues, artists or shows from a csv / jsonl file into the
+        database, inserting and committing batch_size rows at a time with one
+        multi-row INSERT, so memory stays flat however large the file is.
+        rows that fail to parse or resolve are written to the rejects file
+        as JSON lines with their line number and the reason. when the
+        database refuses a batch, it is inserted again row by row, each in
+        a savepoint, and the rows it refuses are rejected the same way.
+    '''
+    model, parse, resolve, inserted = IMPORTERS[kind]
+    if fmt is None:
+        fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    if rejects is None:
+        rejects = path + '.rejects.jsonl'
+
+    imported = 0
+    rejected = 0
+    with open(rejects, 'w', encoding='utf-8') as rejects_file:
+        def reject(line_num, raw, error):
+            rejects_file.write(json.dumps({
+                'line': line_num,
+                'error': str(error),
+                'row': raw if isinstance(raw, dict) else None,
+            }, default=str) + '\n')
+
+        def insert_each(entries):
+            rows = []
+            failures = []
+            for line_num, raw, row in entries:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(model.__table__.insert().values(row))
+                except (IntegrityError, DataError) as e:
+                    failures.append((line_num, raw, RowError(str(e.orig).splitlines()[0])))
+                    continue
+                rows.append(row)
+            return rows, failures
+
+        def flush(batch):
+            if resolve is not None:
+                entries, failures = resolve(batch)
+            else:
+                entries, failures = batch, []
+            rows = [row for _, _, row in entries]
+            if rows:
+                try:
+                    db.session.execute(model.__table__.insert().values(rows))
+                except (IntegrityError, DataError):
+                    db.session.rollback()
+                    rows, refused = insert_each(entries)
+                    failures = failures + refused
+                if rows and inserted is not None:
+                    inserted(rows)
+                db.session.commit()
+            for failure in failures:
+                reject(*failure)
+            return len(rows), len(failures)
+
+        batch = []
+        for line_num, raw in read_rows(path, fmt):
+            try:
+                if isinstance(raw, RowError):
+                    raise raw
+                if not isinstance(raw, dict):
+                    raise RowError('row must be an object')
+                batch.append((line_num, raw, parse(raw)))
+            except RowError as e:
+                reject(line_num, raw, e)
+                rejected += 1
+                continue
+            if len(batch) >= batch_size:
+                done, failed = flush(batch)
+                imported += done
+                rejected += failed
+                batch = []
+        if batch:
+            done, failed = flush(batch)
+            imported += done
+            rejected += failed
+
+    return ImportResult(imported, rejected)
@@ -0,0 +1,38 @@
+"""show duration and slot indexes
+
+Revision ID: 0b5e8c3f7a19
+Revises: a6d3c9f81e25
+Create Date: 2026-10-18 21:03:44.518920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5e8c3f7a19'
+down_revision = 'a6d3c9f81e25'
+branch_labels = None
+depends_on = None
+
+SLOT = "tsrange(start_time, start_time + duration * interval '1 minute')"
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('duration', sa.Integer(), nullable=False, server_default='120'))
+    op.create_check_constraint('ck_Show_duration', 'Show', 'duration > 0')
+    # plain GiST indexes rather than an EXCLUDE constraint: shows booked
+    # before this revision may already overlap, see `flask fyyur conflicts`
+    op.create_index('ix_Show_venue_slot', 'Show',
+                    [sa.text("int4range(venue_id, venue_id, '[]')"), sa.text(SLOT)],
+                    postgresql_using='gist')
+    op.create_index('ix_Show_artist_slot', 'Show',
+                    [sa.text("int4range(artist_id, artist_id, '[]')"), sa.text(SLOT)],
+                    postgresql_using='gist')
+
+
+def downgrade():
+    op.drop_index('ix_Show_artist_slot', table_name='Show')
+    op.drop_index('ix_Show_venue_slot', table_name='Show')
+    op.drop_constraint('ck_Show_duration', 'Show', type_='check')
+    op.drop_column('Show', 'duration')
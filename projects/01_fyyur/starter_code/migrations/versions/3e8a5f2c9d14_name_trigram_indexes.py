@@ -0,0 +1,37 @@
+"""name trigram indexes
+
+Revision ID: 3e8a5f2c9d14
+Revises: 7d4c1b9e2a60
+Create Date: 2026-10-18 18:12:26.540873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8a5f2c9d14'
+down_revision = '7d4c1b9e2a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm is optional: without it the partial name match of search.py
+    # scans the table instead
+    op.execute('''
+    DO $$
+    BEGIN
+      IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS "ix_Artist_name_trgm" ON "Artist" USING gin (name gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS "ix_Venue_name_trgm" ON "Venue" USING gin (name gin_trgm_ops);
+      END IF;
+    END
+    $$
+    ''')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS "ix_Venue_name_trgm"')
+    op.execute('DROP INDEX IF EXISTS "ix_Artist_name_trgm"')
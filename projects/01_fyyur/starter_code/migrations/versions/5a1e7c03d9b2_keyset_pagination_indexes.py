@@ -0,0 +1,28 @@
+"""keyset pagination indexes
+
+Revision ID: 5a1e7c03d9b2
+Revises: 157bdc2300c4
+Create Date: 2026-10-18 10:12:31.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1e7c03d9b2'
+down_revision = '157bdc2300c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'], unique=False)
+    op.create_index('ix_Venue_name_id', 'Venue', ['name', 'id'], unique=False)
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
+    op.drop_index('ix_Venue_name_id', table_name='Venue')
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
@@ -0,0 +1,25 @@
+"""venue area index
+
+Revision ID: 7d4c1b9e2a60
+Revises: 0b5e8c3f7a19
+Create Date: 2026-10-18 16:05:41.382190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d4c1b9e2a60'
+down_revision = '0b5e8c3f7a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_area', 'Venue',
+                    ['city', sa.text("coalesce(state, '')"), 'name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Venue_area', table_name='Venue')
@@ -0,0 +1,39 @@
+"""search document indexes
+
+Revision ID: 9c4b2d71e0a8
+Revises: 5a1e7c03d9b2
+Create Date: 2026-10-18 11:40:07.216554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4b2d71e0a8'
+down_revision = '5a1e7c03d9b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('''
+    CREATE OR REPLACE FUNCTION fyyur_search_document(name text, city text, state text, genres text[])
+    RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+      SELECT setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+          || setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B')
+          || setweight(to_tsvector('simple', coalesce(array_to_string(genres, ' '), '')), 'C')
+    $$
+    ''')
+    op.create_index('ix_Artist_search_document', 'Artist',
+                    [sa.text('fyyur_search_document(name, city, state, genres)')],
+                    postgresql_using='gin')
+    op.create_index('ix_Venue_search_document', 'Venue',
+                    [sa.text('fyyur_search_document(name, city, state, genres)')],
+                    postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Venue_search_document', table_name='Venue')
+    op.drop_index('ix_Artist_search_document', table_name='Artist')
+    op.execute('DROP FUNCTION fyyur_search_document(text, text, text, text[])')
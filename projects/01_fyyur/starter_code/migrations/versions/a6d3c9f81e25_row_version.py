@@ -0,0 +1,26 @@
+"""version column on Venue and Artist
+
+Revision ID: a6d3c9f81e25
+Revises: f2b9d4e1a6c8
+Create Date: 2026-10-18 19:12:08.730214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d3c9f81e25'
+down_revision = 'f2b9d4e1a6c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'version')
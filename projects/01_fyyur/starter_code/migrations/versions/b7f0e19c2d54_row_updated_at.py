@@ -0,0 +1,27 @@
+"""row updated_at
+
+Revision ID: b7f0e19c2d54
+Revises: e3d85a6f41c7
+Create Date: 2026-10-18 14:21:45.613202
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7f0e19c2d54'
+down_revision = 'e3d85a6f41c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Artist', 'Venue', 'Show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.text("timezone('utc', now())")))
+
+
+def downgrade():
+    for table in ('Show', 'Venue', 'Artist'):
+        op.drop_column(table, 'updated_at')
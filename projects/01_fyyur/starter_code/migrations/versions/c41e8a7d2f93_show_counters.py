@@ -0,0 +1,43 @@
+"""show counters on Venue and Artist
+
+Revision ID: c41e8a7d2f93
+Revises: b7f0e19c2d54
+Create Date: 2026-10-18 16:02:11.384519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e8a7d2f93'
+down_revision = 'b7f0e19c2d54'
+branch_labels = None
+depends_on = None
+
+OWNERS = {'Venue': 'venue_id', 'Artist': 'artist_id'}
+
+
+def upgrade():
+    for table, owner in OWNERS.items():
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(), nullable=True))
+        op.create_index('ix_{}_next_show_at'.format(table), table, ['next_show_at'], unique=False)
+        op.execute('''
+            UPDATE "{table}" SET
+              upcoming_shows_count = (SELECT count(*) FROM "Show"
+                                      WHERE "Show".{owner} = "{table}".id AND "Show".start_time >= localtimestamp),
+              past_shows_count = (SELECT count(*) FROM "Show"
+                                  WHERE "Show".{owner} = "{table}".id AND "Show".start_time < localtimestamp),
+              next_show_at = (SELECT min("Show".start_time) FROM "Show"
+                              WHERE "Show".{owner} = "{table}".id AND "Show".start_time >= localtimestamp)
+        '''.format(table=table, owner=owner))
+
+
+def downgrade():
+    for table in reversed(list(OWNERS)):
+        op.drop_index('ix_{}_next_show_at'.format(table), table_name=table)
+        op.drop_column(table, 'next_show_at')
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
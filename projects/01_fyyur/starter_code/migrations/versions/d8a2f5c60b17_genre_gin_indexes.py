@@ -0,0 +1,26 @@
+"""GIN indexes on Venue and Artist genres
+
+Revision ID: d8a2f5c60b17
+Revises: c41e8a7d2f93
+Create Date: 2026-10-18 17:10:42.905316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a2f5c60b17'
+down_revision = 'c41e8a7d2f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
@@ -0,0 +1,28 @@
+"""show access path indexes
+
+Revision ID: e3d85a6f41c7
+Revises: 9c4b2d71e0a8
+Create Date: 2026-10-18 13:05:52.907361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3d85a6f41c7'
+down_revision = '9c4b2d71e0a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # venue page, venue directory counts and venue deletes
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    # artist page and artist deletes
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
@@ -0,0 +1,33 @@
+"""ON DELETE CASCADE on the Show foreign keys
+
+Revision ID: f2b9d4e1a6c8
+Revises: d8a2f5c60b17
+Create Date: 2026-10-18 18:04:27.551093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b9d4e1a6c8'
+down_revision = 'd8a2f5c60b17'
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [
+    ('Show_artist_id_fkey', 'Artist', 'artist_id'),
+    ('Show_venue_id_fkey', 'Venue', 'venue_id'),
+]
+
+
+def upgrade():
+    for name, referent, column in FOREIGN_KEYS:
+        op.drop_constraint(name, 'Show', type_='foreignkey')
+        op.create_foreign_key(name, 'Show', referent, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    for name, referent, column in FOREIGN_KEYS:
+        op.drop_constraint(name, 'Show', type_='foreignkey')
+        op.create_foreign_key(name, 'Show', referent, [column], ['id'])
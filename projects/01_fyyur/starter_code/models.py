@@ -0,0 +1,187 @@
+from sqlalchemy import DDL, Interval, event, func, literal_column
+
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+'''
+setup_db(app)
+    binds a flask application and a SQLAlchemy service
+'''
+def setup_db(app):
+    db.app = app
+    db.init_app(app)
+
+'''
+fyyur_search_document(name, city, state, genres)
+    the tsvector venues and artists are searched on. array_to_string is only
+    STABLE, so it is wrapped in an IMMUTABLE function to be indexable.
+    keep in sync with migration 9c4b2d71e0a8.
+'''
+search_document_function = DDL('''
+CREATE OR REPLACE FUNCTION fyyur_search_document(name text, city text, state text, genres text[])
+RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+  SELECT setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+      || setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B')
+      || setweight(to_tsvector('simple', coalesce(array_to_string(genres, ' '), '')), 'C')
+$$
+''')
+event.listen(db.metadata, 'before_create', search_document_function)
+
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+'''
+updated_at
+    when a row last changed, in UTC. it versions the row for the ETag and
+    Last-Modified headers of the JSON API.
+'''
+def updated_at_column():
+    utc_now = func.timezone('utc', func.now())
+    return db.Column(db.DateTime(), nullable=False, server_default=utc_now, onupdate=utc_now)
+
+'''
+upcoming_shows_count, past_shows_count, next_show_at
+    show counters kept on Venue and Artist by counters.py, so listings
+    read them without touching Show. next_show_at is the soonest
+    upcoming show; once it passes, the rollover job recounts the row.
+'''
+def show_counter_columns():
+    return (db.Column(db.Integer, nullable=False, server_default='0'),
+            db.Column(db.Integer, nullable=False, server_default='0'),
+            db.Column(db.DateTime()))
+
+'''
+SHOW_DURATION
+    how long a show occupies its venue and artist, in minutes, unless it
+    says otherwise
+show_slot(start_time, duration)
+    the [start, end) tsrange a show occupies
+owner_range(id)
+    the single-value int4range [id, id]. Postgres has no GiST operator
+    class for plain integers without btree_gist, so the slot indexes key
+    the venue / artist as a range and are searched with @>.
+'''
+SHOW_DURATION = 120
+MINUTE = literal_column("interval '1 minute'", Interval)
+
+
+def show_slot(start_time, duration):
+    return func.tsrange(start_time, start_time + duration * MINUTE)
+
+
+def owner_range(id):
+    return func.int4range(id, id, literal_column("'[]'"))
+
+
+class Show(db.Model):
+    __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.CheckConstraint('duration > 0', name='ck_Show_duration'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+    start_time = db.Column(db.DateTime())
+    duration = db.Column(db.Integer, nullable=False, server_default=str(SHOW_DURATION))
+    updated_at = updated_at_column()
+    venue = db.relationship("Venue",back_populates="artists")
+    artist = db.relationship("Artist",back_populates="venues")
+
+'''
+ix_Show_venue_slot, ix_Show_artist_slot
+    GiST indexes over the slot each show occupies, per venue and per
+    artist, so a booking finds the shows it would overlap in O(log n).
+    keep in sync with migration 0b5e8c3f7a19.
+'''
+db.Index('ix_Show_venue_slot', owner_range(Show.venue_id), show_slot(Show.start_time, Show.duration),
+         postgresql_using='gist')
+db.Index('ix_Show_artist_slot', owner_range(Show.artist_id), show_slot(Show.start_time, Show.duration),
+         postgresql_using='gist')
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_id', 'name', 'id'),
+        db.Index('ix_Artist_next_show_at', 'next_show_at'),
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(500), nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    genres = db.Column(db.ARRAY(db.String))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    updated_at = updated_at_column()
+    upcoming_shows_count, past_shows_count, next_show_at = show_counter_columns()
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    venues = db.relationship('Show', back_populates="artist",cascade="all,delete",passive_deletes=True)
+
+db.Index('ix_Artist_search_document',
+         func.fyyur_search_document(Artist.name, Artist.city, Artist.state, Artist.genres),
+         postgresql_using='gin')
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_name_id', 'name', 'id'),
+        db.Index('ix_Venue_next_show_at', 'next_show_at'),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(500), nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    genres = db.Column(db.ARRAY(db.String))
+    updated_at = updated_at_column()
+    upcoming_shows_count, past_shows_count, next_show_at = show_counter_columns()
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    artists = db.relationship('Show', back_populates="venue",cascade="all,delete",passive_deletes=True)
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+# the venue directory's keyset order, see directory.AREA_ORDER
+db.Index('ix_Venue_area', Venue.city, func.coalesce(Venue.state, ''), Venue.name, Venue.id)
+
+db.Index('ix_Venue_search_document',
+         func.fyyur_search_document(Venue.name, Venue.city, Venue.state, Venue.genres),
+         postgresql_using='gin')
+
+'''
+TRIGRAM_INDEXES
+    GIN trigram indexes behind the partial name match of search.py. pg_trgm
+    is an optional extension, so they are only created where the server
+    has it; elsewhere the match scans the table. they are left out of the
+    metadata so autogenerate ignores them, see include_object in app.py.
+    keep in sync with migration 3e8a5f2c9d14.
+'''
+TRIGRAM_INDEXES = frozenset(['ix_Artist_name_trgm', 'ix_Venue_name_trgm'])
+trigram_indexes = DDL('''
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS "ix_Artist_name_trgm" ON "Artist" USING gin (name gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS "ix_Venue_name_trgm" ON "Venue" USING gin (name gin_trgm_ops);
+  END IF;
+END
+$$
+''')
+event.listen(db.metadata, 'after_create', trigram_indexes)
+
+
+# TODO: implement any missing fields, as a database migration using Flask-Migrate
+
+# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
@@ -0,0 +1,140 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import namedtuple
+
+from flask import abort
+from sqlalchemy import tuple_
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+STREAM_BATCH = 100
+
+'''
+Page
+    one page of a keyset paginated query. next_cursor / prev_cursor are
+    None when there is nothing further in that direction.
+'''
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value
+              for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _cursor_value(column, value):
+    python_type = column.type.python_type
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    # exact type: a bool is an int to isinstance, but not to Postgres
+    if type(value) is not python_type:
+        raise TypeError('{!r} is not a {}'.format(value, python_type.__name__))
+    return value
+
+
+def decode_cursor(cursor, columns):
+    '''
+    decode_cursor(cursor, columns)
+        turns a cursor back into sort key values, aborting with 400 when it
+        was tampered with or does not match the sort columns, in number or
+        in the type of a value
+    '''
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [_cursor_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        abort(400)
+
+
+def paginate(query, columns, key, after=None, before=None, per_page=PAGE_SIZE):
+    '''
+    paginate(query, columns, key, after, before, per_page)
+        fetches one page of query ordered by columns, seeking past the cursor
+        with a row comparison instead of an OFFSET so every page costs the
+        same. key(row) must return the row's values for columns.
+    '''
+    if before:
+        values = decode_cursor(before, columns)
+        rows = query.filter(tuple_(*columns) < tuple_(*values)) \
+            .order_by(*[column.desc() for column in columns]) \
+            .limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        rows.reverse()
+        if not rows:
+            return Page(rows, None, None)
+        return Page(rows,
+                    encode_cursor(key(rows[-1])),
+                    encode_cursor(key(rows[0])) if has_more else None)
+
+    if after:
+        values = decode_cursor(after, columns)
+        query = query.filter(tuple_(*columns) > tuple_(*values))
+    rows = query.order_by(*columns).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not rows:
+        return Page(rows, None, None)
+    return Page(rows,
+                encode_cursor(key(rows[-1])) if has_more else None,
+                encode_cursor(key(rows[0])) if after else None)
+
+
+class StreamedPage(object):
+    '''
+    StreamedPage(query, columns, key, after, before, per_page)
+        the same page as paginate(), read from a server-side cursor as it is
+        iterated instead of loaded up front, so a template can stream it.
+        next_cursor / prev_cursor are filled in once the rows have been
+        iterated. a `before` page is read in reverse and has to be held to
+        be flipped, but never holds more than per_page rows.
+    '''
+
+    def __init__(self, query, columns, key, after=None, before=None, per_page=PAGE_SIZE):
+        self.key = key
+        self.per_page = per_page
+        self.next_cursor = None
+        self.prev_cursor = None
+        self.after = after
+        self.before = before
+        if before:
+            self.rows = query.filter(tuple_(*columns) < tuple_(*decode_cursor(before, columns))) \
+                .order_by(*[column.desc() for column in columns])
+        else:
+            if after:
+                query = query.filter(tuple_(*columns) > tuple_(*decode_cursor(after, columns)))
+            self.rows = query.order_by(*columns)
+        self.rows = self.rows.limit(per_page + 1) \
+            .execution_options(stream_results=True).yield_per(min(per_page + 1, STREAM_BATCH))
+
+    def __iter__(self):
+        if self.before:
+            rows = list(self.rows)
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            if rows:
+                self.next_cursor = encode_cursor(self.key(rows[-1]))
+                self.prev_cursor = encode_cursor(self.key(rows[0])) if has_more else None
+            for row in rows:
+                yield row
+            return
+
+        first = last = None
+        for count, row in enumerate(self.rows, 1):
+            if count > self.per_page:
+                self.next_cursor = encode_cursor(self.key(last))
+                continue
+            if first is None:
+                first = row
+                if self.after:
+                    self.prev_cursor = encode_cursor(self.key(first))
+            last = row
+            yield row
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats(object):
+    '''
+    PoolStats()
+        connection pool counters for this worker process
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            stats = {
+                'pid': os.getpid(),
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return stats
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    '''
+    InstrumentedQueuePool
+        a QueuePool that also times how long each checkout waits for a
+        connection, including opening a new one, and counts timeouts
+    '''
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super(InstrumentedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            pool_stats.incr('timeouts')
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+@event.listens_for(InstrumentedQueuePool, 'connect')
+def on_connect(dbapi_connection, connection_record):
+    pool_stats.incr('connects')
+
+
+@event.listens_for(InstrumentedQueuePool, 'checkout')
+def on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.incr('checkouts')
+
+
+@event.listens_for(InstrumentedQueuePool, 'checkin')
+def on_checkin(dbapi_connection, connection_record):
+    pool_stats.incr('checkins')
+
+
+@event.listens_for(InstrumentedQueuePool, 'invalidate')
+def on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.incr('invalidations')
+
+
+def init_pool(app):
+    '''
+    init_pool(app)
+        makes the app's engine use the instrumented pool. call it before the
+        engine is first used.
+    '''
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('poolclass', InstrumentedQueuePool)
@@ -0,0 +1,112 @@
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_bind_params = re.compile(r'%\(\w+\)s|%s|\?')
+_bind_lists = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_whitespace = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    '''
+    fingerprint(statement)
+        the statement with bind parameters and IN lists collapsed, so the
+        same query issued with different values maps to the same string
+    '''
+    statement = _bind_params.sub('?', statement)
+    statement = _bind_lists.sub('(?)', statement)
+    return _whitespace.sub(' ', statement).strip()
+
+
+class QueryProfiler(object):
+    '''
+    QueryProfiler(app)
+        when SQL_PROFILER is on, counts the statements and database time of
+        every request, adds them as a Server-Timing header and logs a warning
+        when a route goes over SQL_PROFILER_QUERY_BUDGET statements or runs
+        the same statement SQL_PROFILER_DUPLICATE_LIMIT times or more, the
+        usual sign of an N+1 query. totals per endpoint are kept in
+        endpoints for the worker. statements run while a streamed response
+        body is generated happen after the response and are not counted.
+    '''
+
+    def __init__(self, app=None):
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('SQL_PROFILER', False)
+        app.config.setdefault('SQL_PROFILER_QUERY_BUDGET', 10)
+        app.config.setdefault('SQL_PROFILER_DUPLICATE_LIMIT', 3)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _start(self):
+        if self.app.config['SQL_PROFILER']:
+            g.sql_profile = {'count': 0, 'time': 0.0, 'fingerprints': Counter()}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_profile' in g:
+            conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not (has_request_context() and 'sql_profile' in g):
+            return
+        started = conn.info.get('profiler_started')
+        if not started:
+            return
+        profile = g.sql_profile
+        profile['count'] += 1
+        profile['time'] += time.perf_counter() - started.pop()
+        profile['fingerprints'][fingerprint(statement)] += 1
+
+    def _finish(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        endpoint = request.endpoint or request.path
+        duration_ms = profile['time'] * 1000
+        response.headers.add('Server-Timing', 'db;dur={:.2f};desc="{} queries"'.format(
+            duration_ms, profile['count']))
+
+        limit = self.app.config['SQL_PROFILER_DUPLICATE_LIMIT']
+        duplicates = [(statement, count) for statement, count in profile['fingerprints'].most_common()
+                      if count >= limit]
+        budget = self.app.config['SQL_PROFILER_QUERY_BUDGET']
+        if profile['count'] > budget or duplicates:
+            self.app.logger.warning(
+                '%s ran %d queries in %.1fms (budget %d)%s', endpoint, profile['count'],
+                duration_ms, budget, ''.join('\n  %dx %s' % (count, statement)
+                                             for statement, count in duplicates))
+
+        with self._lock:
+            totals = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'duplicates': Counter()})
+            totals['requests'] += 1
+            totals['queries'] += profile['count']
+            totals['max_queries'] = max(totals['max_queries'], profile['count'])
+            totals['db_ms'] += duration_ms
+            for statement, count in duplicates:
+                totals['duplicates'][statement] += count
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: {
+                'requests': totals['requests'],
+                'queries': totals['queries'],
+                'avg_queries': round(totals['queries'] / totals['requests'], 2),
+                'max_queries': totals['max_queries'],
+                'avg_db_ms': round(totals['db_ms'] / totals['requests'], 3),
+                'duplicates': dict(totals['duplicates'].most_common(5)),
+            } for endpoint, totals in self.endpoints.items()}
@@ -0,0 +1,118 @@
+import datetime
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.selectable import SelectBase
+
+'''
+REPLICA_BIND_PREFIX
+    SQLALCHEMY_BINDS keys starting with it are read replicas of the
+    primary database, see SQLALCHEMY_REPLICA_URIS in config.py
+READ_METHODS
+    the requests that may read from a replica
+PRIMARY_ENDPOINTS
+    the GET views that always read from the primary: the edit forms carry
+    the row version the edit is checked against, so a lagging replica
+    would turn the edit into a false conflict
+'''
+REPLICA_BIND_PREFIX = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+PRIMARY_ENDPOINTS = frozenset(['edit_artist', 'edit_venue'])
+STICKY_KEY = 'read_primary_until'
+
+
+def replica_binds(app):
+    return sorted(bind for bind in app.config.get('SQLALCHEMY_BINDS') or ()
+                  if bind.startswith(REPLICA_BIND_PREFIX))
+
+
+def replica_bind():
+    '''
+    replica_bind()
+        the replica the current request reads from, or None when it has to
+        use the primary: outside requests, for anything but GET / HEAD, for
+        PRIMARY_ENDPOINTS, when no replica is configured, and for
+        REPLICA_LAG_SECONDS after the same client wrote something
+        (read-your-writes). one replica is picked at random per request.
+    '''
+    if not has_request_context() or request.method not in READ_METHODS \
+            or request.endpoint in PRIMARY_ENDPOINTS:
+        return None
+    if 'db_replica' not in g:
+        binds = replica_binds(current_app)
+        sticky = session.get(STICKY_KEY, 0) > time.time()
+        g.db_replica = random.choice(binds) if binds and not sticky else None
+    return g.db_replica
+
+
+def replica_expiry(now):
+    '''
+    replica_expiry(now)
+        the latest a value read from a replica during this request may be
+        cached until, as it may lag the primary; None on the primary
+    '''
+    if replica_bind() is None:
+        return None
+    return now + datetime.timedelta(seconds=current_app.config.get('REPLICA_LAG_SECONDS', 5))
+
+
+def routed_bind(session, clause):
+    '''
+    routed_bind(session, clause)
+        the replica a statement of session goes to: replica_bind() for the
+        SELECTs, None (the primary) for everything else (flushes, INSERT /
+        UPDATE / DELETE, raw SQL), noting in g that the request wrote
+    '''
+    if not session._flushing and isinstance(clause, SelectBase):
+        return replica_bind()
+    if has_request_context() and (session._flushing or isinstance(clause, (UpdateBase, TextClause))):
+        g.db_wrote = True
+    return None
+
+
+class RoutingSession(SignallingSession):
+    '''
+    RoutingSession
+        sends the SELECTs of requests that may read from a replica to that
+        replica's engine and everything else to the primary, see routed_bind
+    '''
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        bind = routed_bind(self, clause)
+        if bind is not None:
+            return get_state(self.app).db.get_engine(self.app, bind=bind)
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    '''
+    RoutingSQLAlchemy
+        Flask-SQLAlchemy with RoutingSession as its session class
+    '''
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def init_routing(app):
+    '''
+    init_routing(app)
+        after a request that wrote, keeps the client's reads on the primary
+        for REPLICA_LAG_SECONDS, so it sees its own changes
+    '''
+    app.config.setdefault('REPLICA_LAG_SECONDS', 5)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.pop('db_wrote', False) and replica_binds(app):
+            session[STICKY_KEY] = time.time() + app.config['REPLICA_LAG_SECONDS']
+        return response
+
+    @app.teardown_request
+    def forget_replica(exc):
+        g.pop('db_replica', None)
@@ -0,0 +1,226 @@
+import datetime
+import itertools
+from collections import namedtuple
+
+import dateutil.parser
+from dateutil import rrule
+from sqlalchemy import DateTime, Integer, and_, column, literal, values
+from sqlalchemy.orm import aliased
+
+from models import db, Show, Artist, Venue, SHOW_DURATION, show_slot, owner_range
+from counters import refresh_counters
+from cache import render_cache, show_page_keys
+
+MAX_BATCH_SHOWS = 500
+MAX_SHOW_DURATION = 24 * 60
+
+'''
+FREQUENCIES
+    the named recurrences the scheduling form offers, as (rrule frequency,
+    interval). any other rule is read as an RFC 5545 RRULE.
+'''
+FREQUENCIES = {
+    'daily': (rrule.DAILY, 1),
+    'weekly': (rrule.WEEKLY, 1),
+    'biweekly': (rrule.WEEKLY, 2),
+    'monthly': (rrule.MONTHLY, 1),
+}
+
+'''
+ScheduleResult
+    the start times that were booked and the (start time, reason) pairs
+    that were not
+'''
+ScheduleResult = namedtuple('ScheduleResult', ['scheduled', 'conflicts'])
+
+'''
+Conflict
+    two shows of the same venue or artist (kind) whose slots overlap
+'''
+Conflict = namedtuple('Conflict', ['kind', 'owner_id', 'show_id', 'start_time', 'other_id', 'other_start_time'])
+
+
+class ScheduleError(ValueError):
+    pass
+
+
+def expand_recurrence(start_time, rule, count=None):
+    '''
+    expand_recurrence(start_time, rule, count)
+        the start times of a recurrence beginning at start_time. rule is a
+        FREQUENCIES name, repeated count times, or an RRULE string such as
+        "FREQ=WEEKLY;BYDAY=FR;COUNT=52", which must bound itself with COUNT
+        or UNTIL.
+    '''
+    if rule in FREQUENCIES:
+        if not isinstance(count, int) or count < 1:
+            raise ScheduleError('the number of occurrences is required')
+        frequency, interval = FREQUENCIES[rule]
+        occurrences = rrule.rrule(frequency, dtstart=start_time, interval=interval, count=count)
+    else:
+        try:
+            occurrences = rrule.rrulestr(rule, dtstart=start_time)
+        except (ValueError, TypeError) as e:
+            raise ScheduleError('invalid recurrence rule: {}'.format(e))
+    start_times = list(itertools.islice(occurrences, MAX_BATCH_SHOWS + 1))
+    if len(start_times) > MAX_BATCH_SHOWS:
+        raise ScheduleError('a batch is limited to {} shows'.format(MAX_BATCH_SHOWS))
+    return start_times
+
+
+def naive_local(start_time):
+    '''
+    naive_local(start_time)
+        start_time as the naive server-local datetime the Show table stores,
+        the time datetime.now() and localtimestamp compare it with; naive
+        ones are taken to be local already
+    '''
+    if start_time.tzinfo is None:
+        return start_time
+    return start_time.astimezone().replace(tzinfo=None)
+
+
+def parse_start_times(lines):
+    '''
+    parse_start_times(lines)
+        naive local datetimes from a list of strings (or datetimes), blank
+        ones skipped
+    '''
+    start_times = []
+    for line in lines:
+        if isinstance(line, str):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                line = dateutil.parser.parse(line)
+            except (ValueError, OverflowError):
+                raise ScheduleError('invalid start time: {}'.format(line))
+        start_times.append(naive_local(line))
+    return start_times
+
+
+def booked_slots(shows, duration):
+    '''
+    booked_slots(shows, duration)
+        {(venue_id, artist_id, start_time): reason} for the candidate shows
+        whose slot of duration minutes overlaps a show their venue or their
+        artist already has. one query: every candidate slot is probed
+        through ix_Show_venue_slot / ix_Show_artist_slot.
+    '''
+    candidates = values(column('venue_id', Integer), column('artist_id', Integer),
+                        column('start_time', DateTime), name='candidate').data(list(shows))
+    slot = show_slot(candidates.c.start_time, duration)
+    # one probe per owner rather than an OR, so each uses its index on
+    # both the owner and the slot
+    rows = db.session.query(candidates, literal(True).label('venue')) \
+        .join(Show, and_(owner_range(Show.venue_id).op('@>')(candidates.c.venue_id),
+                         show_slot(Show.start_time, Show.duration).op('&&')(slot))) \
+        .union_all(db.session.query(candidates, literal(False))
+                   .join(Show, and_(owner_range(Show.artist_id).op('@>')(candidates.c.artist_id),
+                                    show_slot(Show.start_time, Show.duration).op('&&')(slot))))
+    booked = {}
+    for row in rows:
+        show = (row.venue_id, row.artist_id, row.start_time)
+        if row.venue or show not in booked:
+            booked[show] = 'the venue already has a show then' if row.venue \
+                else 'the artist already has a show then'
+    return booked
+
+
+def schedule_shows(venue_id, artist_id, start_times, duration=SHOW_DURATION):
+    '''
+    schedule_shows(venue_id, artist_id, start_times, duration)
+        books the artist at the venue for duration minutes at every start
+        time, in one transaction with a single multi-row INSERT. the artist
+        and venue are checked and locked once up front, so concurrent
+        bookings of either wait for this one; start times repeated in the
+        batch, overlapping an earlier one of the batch, or overlapping a
+        show of the venue or the artist are reported as conflicts and the
+        rest are booked.
+    '''
+    try:
+        venue_id, artist_id = int(venue_id), int(artist_id)
+    except (TypeError, ValueError):
+        raise ScheduleError('artist and venue ids must be integers')
+    try:
+        duration = int(SHOW_DURATION if duration is None else duration)
+    except (TypeError, ValueError):
+        raise ScheduleError('the duration must be a number of minutes')
+    if not 0 < duration <= MAX_SHOW_DURATION:
+        raise ScheduleError('the duration must be between 1 and {} minutes'.format(MAX_SHOW_DURATION))
+    if not start_times:
+        raise ScheduleError('no start times given')
+    if len(start_times) > MAX_BATCH_SHOWS:
+        raise ScheduleError('a batch is limited to {} shows'.format(MAX_BATCH_SHOWS))
+    if db.session.query(Venue.id).filter(Venue.id == venue_id).with_for_update().first() is None:
+        raise ScheduleError('venue {} does not exist'.format(venue_id))
+    if db.session.query(Artist.id).filter(Artist.id == artist_id).with_for_update().first() is None:
+        raise ScheduleError('artist {} does not exist'.format(artist_id))
+
+    booked = {start_time: reason for (_, _, start_time), reason in booked_slots(
+        [(venue_id, artist_id, start_time) for start_time in start_times], duration).items()}
+    scheduled = []
+    conflicts = []
+    seen = set()
+    for start_time in start_times:
+        if start_time in seen:
+            conflicts.append((start_time, 'listed more than once'))
+        elif start_time in booked:
+            conflicts.append((start_time, booked[start_time]))
+        else:
+            scheduled.append(start_time)
+        seen.add(start_time)
+
+    # the batch against itself: in start order, a slot overlaps an earlier
+    # one exactly when it starts before the latest end booked so far
+    length = datetime.timedelta(minutes=duration)
+    overlapping = set()
+    end = None
+    for start_time in sorted(scheduled):
+        if end is not None and start_time < end:
+            overlapping.add(start_time)
+        else:
+            end = start_time + length
+    if overlapping:
+        conflicts += [(start_time, 'overlaps another show of this batch') for start_time in scheduled
+                      if start_time in overlapping]
+        scheduled = [start_time for start_time in scheduled if start_time not in overlapping]
+
+    if scheduled:
+        db.session.execute(Show.__table__.insert().values([
+            {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time, 'duration': duration}
+            for start_time in scheduled]))
+        refresh_counters(Venue, [venue_id])
+        refresh_counters(Artist, [artist_id])
+        db.session.commit()
+        render_cache.invalidate(*show_page_keys(venue_id, artist_id))
+    return ScheduleResult(scheduled, conflicts)
+
+
+def show_conflicts():
+    '''
+    show_conflicts()
+        every pair of shows of the same venue or of the same artist whose
+        slots overlap, as Conflicts in start order. each show is probed
+        through the slot indexes, so the audit is O(n log n) over the table
+        and streamed.
+    '''
+    show, other = aliased(Show), aliased(Show)
+    pairs = []
+    for kind, owner in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        pairs.append(db.session.query(
+            literal(kind).label('kind'),
+            getattr(show, owner).label('owner_id'),
+            show.id.label('show_id'),
+            show.start_time.label('start_time'),
+            other.id.label('other_id'),
+            other.start_time.label('other_start_time'),
+        ).join(other, and_(
+            owner_range(getattr(other, owner)).op('@>')(getattr(show, owner)),
+            show_slot(other.start_time, other.duration).op('&&')(show_slot(show.start_time, show.duration)),
+            show.id < other.id)))
+    rows = pairs[0].union_all(pairs[1]).order_by('start_time', 'show_id', 'other_id') \
+        .execution_options(stream_results=True).yield_per(1000)
+    for row in rows:
+        yield Conflict(*row)
@@ -0,0 +1,69 @@
+import re
+
+from sqlalchemy import func, literal_column, or_
+
+from models import db
+
+SEARCH_LIMIT = 20
+
+
+def search_tsquery(term):
+    '''
+    search_tsquery(term)
+        turns free text into a prefix tsquery, so "san fran" becomes
+        "san:* & fran:*". returns '' when the term has no words in it.
+    '''
+    words = re.findall(r'\w+', term or '', re.UNICODE)
+    return ' & '.join(word + ':*' for word in words)
+
+
+def name_pattern(term):
+    '''
+    name_pattern(term)
+        an ILIKE pattern matching names that contain term anywhere, its
+        % and _ taken literally. returns None for a blank term.
+    '''
+    term = (term or '').strip()
+    if not term:
+        return None
+    return '%{}%'.format(re.sub(r'([\\%_])', r'\\\1', term))
+
+
+def search_document(model):
+    '''
+    search_document(model)
+        the indexed tsvector over name, city, state and genres of a
+        Venue or Artist, see fyyur_search_document in models.py
+    '''
+    return func.fyyur_search_document(model.name, model.city, model.state, model.genres)
+
+
+def search(model, term, limit=SEARCH_LIMIT):
+    '''
+    search(model, term, limit)
+        matches for term and the total number of matches, fetched together
+        in one query. returns (results, total). a record matches when its
+        name contains term anywhere, case-insensitively (through the pg_trgm
+        index where there is one, see TRIGRAM_INDEXES), or when the words
+        of term prefix words of its name, city, state or genres (through
+        the tsvector index). name matches come first, then by ts_rank.
+    '''
+    total = func.count().over().label('total')
+    query = db.session.query(model, total)
+    pattern = name_pattern(term)
+    if pattern is None:
+        query = query.order_by(model.name, model.id)
+    else:
+        in_name = model.name.ilike(pattern, escape='\\')
+        text = search_tsquery(term)
+        if text:
+            # the config is inlined: asyncpg sends typed parameters, and a varchar
+            # one matches no to_tsquery(regconfig, text) overload
+            tsquery = func.to_tsquery(literal_column("'simple'"), text)
+            document = search_document(model)
+            query = query.filter(or_(in_name, document.op('@@')(tsquery))) \
+                .order_by(in_name.desc(), func.ts_rank(document, tsquery).desc(), model.name, model.id)
+        else:
+            query = query.filter(in_name).order_by(model.name, model.id)
+    rows = query.limit(limit).all()
+    return [row[0] for row in rows], (rows[0].total if rows else 0)
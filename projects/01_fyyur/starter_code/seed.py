@@ -0,0 +1,192 @@
+import datetime
+import itertools
+import random
+from collections import namedtuple
+
+from models import db, Show, Artist, Venue, SHOW_DURATION
+from counters import reconcile_counters
+
+SEED_BATCH = 10000
+
+'''
+SCALES
+    named dataset sizes, in shows. venues and artists grow with them.
+'''
+SCALES = {
+    'small': 1000,
+    'medium': 100000,
+    'large': 1000000,
+}
+
+'''
+CITIES
+    (city, state, weight): a few big markets hold most venues and artists
+'''
+CITIES = [
+    ('New York', 'NY', 30), ('Los Angeles', 'CA', 22), ('Chicago', 'IL', 14),
+    ('San Francisco', 'CA', 12), ('Austin', 'TX', 11), ('Nashville', 'TN', 10),
+    ('Seattle', 'WA', 8), ('Atlanta', 'GA', 7), ('New Orleans', 'LA', 7),
+    ('Boston', 'MA', 6), ('Denver', 'CO', 5), ('Portland', 'OR', 5),
+    ('Philadelphia', 'PA', 4), ('Detroit', 'MI', 3), ('Minneapolis', 'MN', 3),
+    ('Miami', 'FL', 3), ('Memphis', 'TN', 2), ('Kansas City', 'MO', 2),
+    ('Salt Lake City', 'UT', 1), ('Albuquerque', 'NM', 1),
+]
+
+'''
+GENRES
+    (genre, weight) over the choices offered by the venue and artist forms
+'''
+GENRES = [
+    ('Rock n Roll', 20), ('Pop', 18), ('Hip-Hop', 14), ('Jazz', 10),
+    ('Alternative', 10), ('Electronic', 9), ('R&B', 8), ('Country', 7),
+    ('Folk', 6), ('Blues', 6), ('Soul', 5), ('Punk', 5), ('Heavy Metal', 5),
+    ('Reggae', 4), ('Funk', 4), ('Classical', 3), ('Instrumental', 3),
+    ('Musical Theatre', 2), ('Other', 2),
+]
+
+_adjectives = ['Blue', 'Electric', 'Velvet', 'Golden', 'Crooked', 'Silver', 'Midnight',
+               'Rusty', 'Lucky', 'Wild', 'Hollow', 'Neon', 'Paper', 'Iron', 'Little']
+_nouns = ['Room', 'Hall', 'Lounge', 'Tavern', 'Stage', 'Cellar', 'Garden', 'Barn',
+          'Theatre', 'Club', 'Den', 'Loft', 'Yard', 'Parlor', 'Ballroom']
+_first_names = ['Alex', 'Sam', 'Jordan', 'Riley', 'Casey', 'Morgan', 'Jamie', 'Quinn',
+                'Avery', 'Rowan', 'Charlie', 'Skyler', 'Harper', 'Dakota', 'Emerson']
+_bands = ['Wolves', 'Lanterns', 'Satellites', 'Rivers', 'Echoes', 'Pilots', 'Ghosts',
+          'Machines', 'Sparrows', 'Strangers', 'Tides', 'Comets', 'Foxes', 'Saints', 'Kings']
+_streets = ['Main St', 'Mission St', 'Broadway', 'Market St', 'Elm St', 'Oak Ave',
+            'Sunset Blvd', '5th Ave', 'Canal St', 'Lake Shore Dr']
+
+'''
+SeedResult
+    how many rows of each table were generated
+'''
+SeedResult = namedtuple('SeedResult', ['venues', 'artists', 'shows'])
+
+
+def scale_sizes(shows):
+    '''
+    scale_sizes(shows)
+        (venues, artists) generated alongside that many shows
+    '''
+    return max(10, shows // 50), max(20, shows // 25)
+
+
+def _weighted(rng, options):
+    values = [option[:-1] if len(option) > 2 else option[0] for option in options]
+    cum_weights = list(itertools.accumulate(option[-1] for option in options))
+    return lambda k=1: rng.choices(values, cum_weights=cum_weights, k=k)
+
+
+def _popularity(count):
+    '''
+    cumulative Zipf-like weights: the first ids get most of the shows
+    '''
+    return list(itertools.accumulate(1.0 / (rank + 1) ** 0.8 for rank in range(count)))
+
+
+def _genres(rng, pick_genre):
+    return sorted(set(pick_genre(rng.randint(1, 3))))
+
+
+def _free(starts, quarter, span):
+    '''
+    whether a show starting at quarter (of an hour) leaves the shows
+    starting at starts, all span quarters long, without overlap
+    '''
+    return not any(other in starts for other in range(quarter - span + 1, quarter + span))
+
+
+def _insert(model, rows):
+    '''
+    inserts rows SEED_BATCH at a time and returns the new ids in insert order
+    '''
+    first_id = db.session.query(db.func.coalesce(db.func.max(model.id), 0)).scalar()
+    for start in range(0, len(rows), SEED_BATCH):
+        db.session.execute(model.__table__.insert(), rows[start:start + SEED_BATCH])
+        db.session.commit()
+    return [row.id for row in db.session.query(model.id).filter(model.id > first_id).order_by(model.id)]
+
+
+def generate(shows=SCALES['small'], seed=42, anchor=None):
+    '''
+    generate(shows, seed, anchor)
+        seeds venues, artists and the given number of shows. cities and
+        genres follow the CITIES / GENRES weights, show counts per venue and
+        artist are long tailed, and start times spread over the year before
+        and the six months after anchor (today by default), in the evening.
+        no two shows of a venue or of an artist overlap: a draw that would
+        is drawn again, so the busiest venues and artists stop at a full
+        calendar. the same seed and anchor always produce the same rows.
+    '''
+    rng = random.Random(seed)
+    if anchor is None:
+        anchor = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    venue_count, artist_count = scale_sizes(shows)
+    pick_city = _weighted(rng, CITIES)
+    pick_genre = _weighted(rng, GENRES)
+
+    venues = []
+    for i in range(venue_count):
+        city, state = pick_city()[0]
+        venues.append({
+            'name': 'The {} {} {}'.format(rng.choice(_adjectives), rng.choice(_nouns), i + 1),
+            'city': city,
+            'state': state,
+            'address': '{} {}'.format(rng.randint(1, 9999), rng.choice(_streets)),
+            'phone': '{}-{}-{:04d}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)),
+            'genres': _genres(rng, pick_genre),
+        })
+    artists = []
+    for i in range(artist_count):
+        city, state = pick_city()[0]
+        if rng.random() < 0.5:
+            name = '{} {} {}'.format(rng.choice(_first_names), rng.choice(_adjectives), i + 1)
+        else:
+            name = 'The {} {} {}'.format(rng.choice(_adjectives), rng.choice(_bands), i + 1)
+        artists.append({
+            'name': name,
+            'city': city,
+            'state': state,
+            'phone': '{}-{}-{:04d}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)),
+            'genres': _genres(rng, pick_genre),
+        })
+
+    venue_ids = _insert(Venue, venues)
+    artist_ids = _insert(Artist, artists)
+    venue_weights = _popularity(len(venue_ids))
+    artist_weights = _popularity(len(artist_ids))
+
+    # start times in quarters of an hour after anchor, per venue and artist
+    span = -(-SHOW_DURATION // 15)
+    venue_starts = {}
+    artist_starts = {}
+    for start in range(0, shows, SEED_BATCH):
+        rows = []
+        while len(rows) < min(SEED_BATCH, shows - start):
+            venue_id = rng.choices(venue_ids, cum_weights=venue_weights)[0]
+            artist_id = rng.choices(artist_ids, cum_weights=artist_weights)[0]
+            quarter = (rng.randint(-365, 180) * 24 + rng.randint(18, 23)) * 4 + rng.randint(0, 3)
+            booked_venue = venue_starts.setdefault(venue_id, set())
+            booked_artist = artist_starts.setdefault(artist_id, set())
+            if not (_free(booked_venue, quarter, span) and _free(booked_artist, quarter, span)):
+                continue
+            booked_venue.add(quarter)
+            booked_artist.add(quarter)
+            rows.append({
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': anchor + datetime.timedelta(minutes=quarter * 15),
+            })
+        db.session.execute(Show.__table__.insert(), rows)
+        db.session.commit()
+    reconcile_counters()
+
+    return SeedResult(len(venue_ids), len(artist_ids), shows)
+
+
+def truncate():
+    '''
+    truncate()
+        empties the Show, Artist and Venue tables and restarts their ids
+    '''
+    db.session.execute('TRUNCATE "Show", "Artist", "Venue" RESTART IDENTITY CASCADE')
+    db.session.commit()
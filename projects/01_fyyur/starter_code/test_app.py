@@ -0,0 +1,1162 @@
+import os
+import time
+import re
+import gzip
+import json
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+import datetime
+import dateutil.parser
+import babel.dates
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import app
+from models import db, Show, Artist, Venue, SHOW_DURATION
+from pagination import paginate, encode_cursor, PAGE_SIZE
+from search import search
+from cache import RenderCache, render_cache
+from importer import import_file, parse_venue, IMPORTERS
+from export import EXPORT_COLUMNS
+from profiler import fingerprint
+from seed import generate, scale_sizes
+from bench import percentile
+from counters import refresh_counters, rollover_counters, reconcile_counters
+from facets import facet_caches
+from formatting import format_datetime, format_datetimes, DATETIME_FORMATS
+from scheduling import show_conflicts, booked_slots
+from assets import build_assets, static_assets
+
+database_path = os.environ.get(
+    'FYYUR_TEST_DATABASE_URL',
+    "postgresql://{}/{}".format('localhost:5432', 'fyyur_test'))
+replica_database_path = os.environ.get(
+    'FYYUR_TEST_REPLICA_DATABASE_URL',
+    "postgresql://{}/{}".format('localhost:5432', 'fyyur_test_replica'))
+
+
+@contextmanager
+def count_queries():
+    '''
+    count_queries()
+        collects every SQL statement the engine executes inside the block
+    '''
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class FyyurTestCase(unittest.TestCase):
+    """This class represents the fyyur test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_path
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        app.config['STATS_ENDPOINTS'] = False
+
+    def setUp(self):
+        """Define test variables and initialize app."""
+        self.client = app.test_client
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        render_cache.clear()
+        for cache in facet_caches.values():
+            cache.clear()
+
+    def tearDown(self):
+        """Executed after reach test"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    @contextmanager
+    def stats_endpoints(self):
+        app.config['STATS_ENDPOINTS'] = True
+        try:
+            yield
+        finally:
+            app.config['STATS_ENDPOINTS'] = False
+
+    def seed_shows(self, venue_id, artist_id, count):
+        now = datetime.datetime.now()
+        for i in range(count):
+            offset = datetime.timedelta(days=i + 1)
+            start_time = now + offset if i % 2 else now - offset
+            db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time))
+        db.session.flush()
+        refresh_counters(Venue, [venue_id])
+        refresh_counters(Artist, [artist_id])
+        db.session.commit()
+
+    def make_venue(self, name='The Musical Hop', city='San Francisco'):
+        venue = Venue(name=name, city=city, state='CA', genres=['Jazz'])
+        db.session.add(venue)
+        db.session.commit()
+        return venue.id
+
+    def make_artist(self, name='Guns N Petals', city='San Francisco'):
+        artist = Artist(name=name, city=city, state='CA', genres=['Rock n Roll'])
+        db.session.add(artist)
+        db.session.commit()
+        return artist.id
+
+    def test_show_venue_splits_upcoming_and_past(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 5)
+
+        res = self.client().get('/venues/{}'.format(venue_id))
+        body = res.get_data(as_text=True)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('2 Upcoming Shows', body)
+        self.assertIn('3 Past Shows', body)
+
+    def test_show_venue_query_count_is_constant(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 2)
+        with count_queries() as few:
+            self.client().get('/venues/{}'.format(venue_id))
+
+        self.seed_shows(venue_id, artist_id, 40)
+        render_cache.clear()
+        with count_queries() as many:
+            self.client().get('/venues/{}'.format(venue_id))
+
+        self.assertEqual(len(few), len(many))
+
+    def test_show_artist_query_count_is_constant(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 2)
+        with count_queries() as few:
+            res = self.client().get('/artists/{}'.format(artist_id))
+
+        self.seed_shows(venue_id, artist_id, 40)
+        render_cache.clear()
+        with count_queries() as many:
+            self.client().get('/artists/{}'.format(artist_id))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(few), len(many))
+
+    def test_show_venue_is_served_from_cache_until_a_show_is_added(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 2)
+        self.client().get('/venues/{}'.format(venue_id))
+
+        with count_queries() as statements:
+            res = self.client().get('/venues/{}'.format(venue_id))
+        self.assertEqual(statements, [])
+        self.assertIn('1 Upcoming Show<', res.get_data(as_text=True))
+
+        start_time = datetime.datetime.now() + datetime.timedelta(days=30)
+        self.client().post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')})
+        res = self.client().get('/venues/{}'.format(venue_id))
+        self.assertIn('2 Upcoming Shows', res.get_data(as_text=True))
+
+    def test_render_cache_evicts_and_expires(self):
+        now = datetime.datetime.now()
+        cache = RenderCache(max_entries=2, ttl=60)
+        cache.set('a', 'A', now=now)
+        cache.set('b', 'B', expires_at=now + datetime.timedelta(seconds=5), now=now)
+        cache.get('a', now=now)
+        cache.set('c', 'C', now=now)
+
+        self.assertEqual(cache.get('a', now=now), 'A')
+        self.assertIsNone(cache.get('b', now=now))
+        self.assertIsNone(cache.get('c', now=now + datetime.timedelta(seconds=61)))
+
+    def test_import_command_streams_rows_and_writes_rejects(self):
+        self.make_venue('The Musical Hop', 'San Francisco')
+        self.make_venue('The Musical Hop', 'New York')
+        artist_id = self.make_artist()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'shows.csv')
+            with open(path, 'w') as f:
+                f.write('artist_id,venue_name,venue_city,start_time\n')
+                f.write('{},The Musical Hop,San Francisco,2035-04-01 20:00\n'.format(artist_id))
+                f.write('{},The Musical Hop,,2035-04-02 20:00\n'.format(artist_id))
+                f.write('999,The Musical Hop,New York,2035-04-03 20:00\n')
+                f.write('{},The Musical Hop,New York,not a date\n'.format(artist_id))
+                f.write('{},The Musical Hop,New York,2035-04-04 20:00\n'.format(artist_id))
+
+            result = app.test_cli_runner().invoke(args=['fyyur', 'import', 'shows', path, '--batch-size', '2'])
+            with open(path + '.rejects.jsonl') as f:
+                rejects = [json.loads(line) for line in f]
+
+        self.assertIn('Imported 2 shows, rejected 3.', result.output)
+        self.assertEqual(Show.query.count(), 2)
+        errors = {reject['line']: reject['error'] for reject in rejects}
+        self.assertEqual(sorted(errors), [3, 4, 5])
+        self.assertIn('ambiguous', errors[3])
+        self.assertIn('unknown artist id 999', errors[4])
+
+    def test_import_rejects_overlapping_shows(self):
+        venue_id = self.make_venue('The Musical Hop', 'San Francisco')
+        other_venue_id = self.make_venue('The Dueling Pianos Bar', 'New York')
+        artist_id = self.make_artist()
+        other_artist_id = self.make_artist('The Wild Sax Band')
+        self.client().post('/shows/create', data={
+            'venue_id': other_venue_id, 'artist_id': other_artist_id, 'start_time': '2035-04-01 20:00:00'})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'shows.csv')
+            with open(path, 'w') as f:
+                f.write('artist_id,venue_id,start_time\n')
+                f.write('{},{},2035-04-01 21:00\n'.format(other_artist_id, venue_id))
+                f.write('{},{},2035-04-02 20:00\n'.format(artist_id, venue_id))
+                f.write('{},{},2035-04-02 21:30\n'.format(other_artist_id, venue_id))
+                f.write('{},{},2035-04-02 19:00\n'.format(artist_id, other_venue_id))
+                f.write('{},{},2035-04-02 20:00\n'.format(other_artist_id, other_venue_id))
+                f.write('{},{},2035-04-02 20:30\n'.format(artist_id, venue_id))
+
+            result = import_file('shows', path, batch_size=5)
+            with open(path + '.rejects.jsonl') as f:
+                errors = {reject['line']: reject['error'] for reject in map(json.loads, f)}
+
+        self.assertEqual(result, (2, 4))
+        self.assertEqual(errors, {
+            2: 'the artist already has a show then',
+            3: 'the artist has another show of this file then',
+            6: 'the venue has another show of this file then',
+            7: 'the venue already has a show then',
+        })
+        self.assertEqual(list(show_conflicts()), [])
+
+    def test_import_venues_from_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'venues.jsonl')
+            with open(path, 'w') as f:
+                f.write(json.dumps({'name': 'The Dueling Pianos Bar', 'city': 'New York',
+                                    'state': 'NY', 'genres': ['Classical', 'R&B']}) + '\n')
+                f.write(json.dumps({'name': 'No City'}) + '\n')
+                f.write('{broken\n')
+
+            result = import_file('venues', path)
+
+        self.assertEqual(result, (1, 2))
+        self.assertEqual(Venue.query.one().genres, ['Classical', 'R&B'])
+
+    def test_import_rejects_rows_too_long_for_their_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'venues.jsonl')
+            with open(path, 'w') as f:
+                for name, phone in [('Park Square', '415-000-1234'), ('Long Phone', '4' * 121),
+                                    ('Dueling Pianos', '914-003-1132')]:
+                    f.write(json.dumps({'name': name, 'city': 'New York', 'phone': phone}) + '\n')
+
+            result = import_file('venues', path, batch_size=3)
+            self.assertEqual(result, (2, 1))
+            with open(path + '.rejects.jsonl') as f:
+                self.assertIn('phone is longer than 120 characters', f.read())
+
+            # a row the parser lets through is still refused by the database
+            # on its own, without losing the rest of its batch
+            Venue.query.delete()
+            db.session.commit()
+            lenient = (Venue, lambda raw: dict(parse_venue(dict(raw, phone=None)), phone=raw['phone']), None, None)
+            with mock.patch.dict(IMPORTERS, venues=lenient):
+                result = import_file('venues', path, batch_size=3)
+            with open(path + '.rejects.jsonl') as f:
+                rejects = [json.loads(line) for line in f]
+
+        self.assertEqual(result, (2, 1))
+        self.assertEqual(sorted(venue.name for venue in Venue.query), ['Dueling Pianos', 'Park Square'])
+        self.assertEqual([reject['line'] for reject in rejects], [2])
+        self.assertIn('too long', rejects[0]['error'])
+
+    def test_export_shows_csv_filters_by_date_and_city(self):
+        hop = self.make_venue('The Musical Hop', 'San Francisco')
+        bar = self.make_venue('The Dueling Pianos Bar', 'New York')
+        artist_id = self.make_artist()
+        self.seed_shows(hop, artist_id, 4)
+        self.seed_shows(bar, artist_id, 4)
+
+        res = self.client().get('/shows/export.csv?city=San+Francisco&from=' +
+                                datetime.date.today().isoformat())
+        lines = res.get_data(as_text=True).splitlines()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(lines[0].split(','), EXPORT_COLUMNS)
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(',San Francisco,' in line for line in lines[1:]))
+
+    def test_export_shows_jsonl_rejects_bad_filters(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 3)
+
+        res = self.client().get('/shows/export.jsonl?venue_id={}'.format(venue_id))
+        shows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+
+        self.assertEqual(len(shows), 3)
+        self.assertEqual(shows[0]['venue_name'], 'The Musical Hop')
+        self.assertEqual(self.client().get('/shows/export.jsonl?from=someday').status_code, 400)
+
+    def test_api_projects_requested_fields_only(self):
+        self.make_venue()
+
+        with count_queries() as statements:
+            res = self.client().get('/api/v1/venues?fields=name,city')
+        venues = res.get_json()['venues']
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(venues, [{'name': 'The Musical Hop', 'city': 'San Francisco'}])
+        self.assertNotIn('image_link', statements[-1])
+        self.assertEqual(self.client().get('/api/v1/venues?fields=password').status_code, 400)
+
+    def test_api_conditional_get_returns_304_until_the_row_changes(self):
+        artist_id = self.make_artist()
+        url = '/api/v1/artists/{}'.format(artist_id)
+
+        res = self.client().get(url)
+        etag = res.headers['ETag']
+        cached = self.client().get(url, headers={'If-None-Match': etag})
+        since = self.client().get(url, headers={'If-Modified-Since': res.headers['Last-Modified']})
+
+        Artist.query.get(artist_id).name = 'Guns N Roses'
+        db.session.commit()
+        changed = self.client().get(url, headers={'If-None-Match': etag})
+
+        self.assertFalse(etag.startswith('W/'))
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_data(), b'')
+        self.assertEqual(since.status_code, 304)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.get_json()['artist']['name'], 'Guns N Roses')
+        self.assertEqual(self.client().get('/api/v1/artists/999').status_code, 404)
+
+    def test_fingerprinted_assets_are_precompressed_and_immutable(self):
+        plain = self.client().get('/static/css/main.css')
+        with tempfile.TemporaryDirectory() as tmp:
+            result = build_assets(app.config['ASSET_SOURCES'], tmp)
+            static_assets.load(tmp)
+            try:
+                home = self.client().get('/').get_data(as_text=True)
+                url = re.search(r'href="(/static/dist/css/bootstrap\.min\.\w{12}\.css)"', home).group(1)
+                compressed = self.client().get(url, headers={'Accept-Encoding': 'gzip'})
+                identity = self.client().get(url, headers={'Accept-Encoding': 'identity'})
+                fonts = re.findall(r'url\("\.\./(fonts/[^"?#]+)', identity.get_data(as_text=True))
+                font = self.client().get('/static/dist/' + fonts[0])
+            finally:
+                static_assets.load(app.config['ASSET_DIRECTORY'])
+
+        self.assertGreater(result.assets, 0)
+        self.assertEqual(plain.status_code, 200)
+        self.assertNotIn('immutable', plain.headers['Cache-Control'])
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed.headers['Content-Type'], 'text/css; charset=utf-8')
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        self.assertEqual(gzip.decompress(compressed.get_data()), identity.get_data())
+        self.assertNotIn('Content-Encoding', identity.headers)
+        for res in (compressed, identity):
+            self.assertEqual(res.status_code, 200)
+            self.assertIn('immutable', res.headers['Cache-Control'])
+            self.assertIn('max-age=31536000', res.headers['Cache-Control'])
+        # bootstrap's glyphicons come from node_modules, under their fingerprinted names
+        self.assertTrue(fonts[0].startswith('fonts/glyphicons-halflings-regular.'))
+        self.assertEqual(font.status_code, 200)
+        self.assertIn('immutable', font.headers['Cache-Control'])
+
+    def test_responses_are_compressed_when_accepted(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 40)
+        app.extensions['compression'].stats.reset()
+
+        # the bodies are compressed, and counted, as they are read
+        identity = self.client().get('/shows')
+        plain = identity.get_data()
+        streamed = self.client().get('/shows', headers={'Accept-Encoding': 'gzip'})
+        streamed_body = streamed.get_data()
+        page = self.client().get('/venues/{}'.format(venue_id), headers={'Accept-Encoding': 'br;q=0, gzip'})
+        page_body = page.get_data()
+        small = self.client().get('/api/v1/venues/{}'.format(venue_id), headers={'Accept-Encoding': 'gzip'})
+        with self.stats_endpoints():
+            stats = self.client().get('/_stats/compression').get_json()
+
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertEqual(identity.headers['Vary'], 'Accept-Encoding')
+        for res in (streamed, page):
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+            self.assertNotIn('Content-Length', res.headers)
+        self.assertEqual(gzip.decompress(streamed_body), plain)
+        self.assertIn(b'The Musical Hop', gzip.decompress(page_body))
+        self.assertNotIn('Content-Encoding', small.headers)
+        self.assertEqual(stats['compressed'], {'gzip': 2})
+        self.assertEqual(stats['skipped'], {'not accepted': 1, 'too small': 1})
+        self.assertGreater(stats['ratio'], 3)
+        self.assertGreater(stats['bytes_in'], stats['bytes_out'])
+
+    def test_pool_stats_count_checkouts(self):
+        with self.stats_endpoints():
+            before = self.client().get('/_stats/pool').get_json()
+            self.client().get('/artists')
+            after = self.client().get('/_stats/pool').get_json()
+
+        self.assertEqual(after['pid'], os.getpid())
+        self.assertGreater(after['checkouts'], before['checkouts'])
+        self.assertEqual(after['size'], app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'])
+        self.assertIn('wait_max_ms', after)
+
+    def test_stats_endpoints_are_off_by_default(self):
+        for path in ('/_stats/pool', '/_stats/sql', '/_stats/compression'):
+            self.assertEqual(self.client().get(path).status_code, 404)
+
+    def test_sql_profiler_reports_queries_and_warns_over_budget(self):
+        venue_id = self.make_venue()
+        app.config.update(SQL_PROFILER=True, SQL_PROFILER_QUERY_BUDGET=0)
+        try:
+            with self.assertLogs(app.logger, 'WARNING') as logs:
+                res = self.client().get('/venues/{}'.format(venue_id))
+            with self.stats_endpoints():
+                stats = self.client().get('/_stats/sql').get_json()
+        finally:
+            app.config.update(SQL_PROFILER=False, SQL_PROFILER_QUERY_BUDGET=10)
+
+        self.assertRegex(res.headers['Server-Timing'], r'^db;dur=[0-9.]+;desc="[1-9][0-9]* queries"$')
+        self.assertIn('show_venue ran', logs.output[0])
+        self.assertGreaterEqual(stats['show_venue']['requests'], 1)
+        self.assertNotIn('Server-Timing', self.client().get('/venues').headers)
+
+    def test_fingerprint_collapses_parameters(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "Show"\n WHERE "Show".venue_id = %(venue_id_1)s'),
+            fingerprint('SELECT * FROM "Show" WHERE "Show".venue_id = %(venue_id_2)s'))
+        self.assertEqual(fingerprint('SELECT 1 WHERE id IN (%(id_1)s, %(id_2)s, %(id_3)s)'),
+                         'SELECT 1 WHERE id IN (?)')
+
+    def test_seed_is_deterministic_and_benchmarks_every_route(self):
+        anchor = datetime.datetime(2026, 1, 1)
+        result = generate(300, seed=7, anchor=anchor)
+        self.assertEqual(list(show_conflicts()), [])
+        first = [tuple(row) for row in db.session.query(
+            Show.venue_id, Show.artist_id, Show.start_time).order_by(Show.id)]
+        db.session.query(Show).delete()
+        db.session.query(Artist).delete()
+        db.session.query(Venue).delete()
+        db.session.commit()
+
+        generate(300, seed=7, anchor=anchor)
+        offset_venue = db.session.query(db.func.min(Venue.id)).scalar() - 1
+        offset_artist = db.session.query(db.func.min(Artist.id)).scalar() - 1
+        second = [(venue_id - offset_venue, artist_id - offset_artist, start_time) for venue_id, artist_id, start_time
+                  in db.session.query(Show.venue_id, Show.artist_id, Show.start_time).order_by(Show.id)]
+        self.assertEqual(result, (*scale_sizes(300), 300))
+        self.assertEqual(first, second)
+
+        res = app.test_cli_runner().invoke(args=['fyyur', 'bench', '--rounds', '3', '--warmup', '0'])
+        self.assertEqual(res.exit_code, 0, res.output)
+        self.assertIn('show_venue', res.output)
+        self.assertIn('search_artists', res.output)
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+
+    def test_datetime_filter_matches_babel_without_reparsing(self):
+        when = datetime.datetime(2035, 4, 1, 20, 0)
+        expected = babel.dates.format_datetime(when, DATETIME_FORMATS['full'])
+
+        with mock.patch('dateutil.parser.parse', wraps=dateutil.parser.parse) as parse:
+            self.assertEqual(format_datetime(when, 'full'), expected)
+            self.assertEqual(format_datetimes([when, when, when.replace(hour=21)], 'full'),
+                             [expected, expected, format_datetime(when.replace(hour=21), 'full')])
+            parse.assert_not_called()
+            self.assertEqual(format_datetime('2035-04-01T20:00:00', 'full'), expected)
+            parse.assert_called_once_with('2035-04-01T20:00:00')
+
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=when))
+        db.session.commit()
+        self.assertIn(expected, self.client().get('/shows').get_data(as_text=True))
+        self.assertIn(expected, self.client().get('/venues/{}'.format(venue_id)).get_data(as_text=True))
+
+    def test_venues_json_groups_by_city_with_upcoming_counts(self):
+        hop = self.make_venue('The Musical Hop', 'San Francisco')
+        self.make_venue('Park Square Live Music & Coffee', 'San Francisco')
+        self.make_venue('The Dueling Pianos Bar', 'New York')
+        artist_id = self.make_artist()
+        self.seed_shows(hop, artist_id, 5)
+
+        res = self.client().get('/venues.json')
+        areas = res.get_json()['areas']
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([area['city'] for area in areas], ['New York', 'San Francisco'])
+        counts = {venue['name']: venue['num_upcoming_shows'] for venue in areas[1]['venues']}
+        self.assertEqual(counts, {'Park Square Live Music & Coffee': 0, 'The Musical Hop': 2})
+
+        page = self.client().get('/venues').get_data(as_text=True)
+        self.assertIn('2 Upcoming Shows', page)
+        self.assertIn('0 Upcoming Shows', page)
+
+    def test_venues_json_pages_keep_areas_together(self):
+        for i in range(PAGE_SIZE + 5):
+            city = ['Austin', 'New York', 'San Francisco'][i % 3]
+            db.session.add(Venue(name='Venue {:02d}'.format(i), city=city,
+                                 state=None if city == 'Austin' else 'CA', genres=['Jazz']))
+        db.session.commit()
+
+        first = self.client().get('/venues.json').get_json()
+        second = self.client().get('/venues.json?after=' + first['next_cursor']).get_json()
+        back = self.client().get('/venues.json?before=' + second['prev_cursor']).get_json()
+        forged = self.client().get('/venues.json?after=' + first['next_cursor'][:-4])
+
+        def venues(page):
+            return [(area['city'], venue['name']) for area in page['areas'] for venue in area['venues']]
+
+        self.assertEqual([area['city'] for area in first['areas']], ['Austin', 'New York', 'San Francisco'])
+        self.assertEqual([area['city'] for area in second['areas']], ['San Francisco'])
+        self.assertEqual(len(venues(first)), PAGE_SIZE)
+        self.assertEqual(len(venues(second)), 5)
+        self.assertEqual(venues(first) + venues(second), sorted(venues(first) + venues(second)))
+        self.assertIsNone(first['prev_cursor'])
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(back['areas'], first['areas'])
+        self.assertEqual(forged.status_code, 400)
+
+    def test_show_counters_follow_creates_rollover_and_deletes(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        soon = datetime.datetime.now() + datetime.timedelta(hours=1)
+        for start_time in (soon, soon + datetime.timedelta(days=7)):
+            self.client().post('/shows/create', data={
+                'venue_id': venue_id, 'artist_id': artist_id,
+                'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')})
+
+        venue = Venue.query.get(venue_id)
+        self.assertEqual((venue.upcoming_shows_count, venue.past_shows_count), (2, 0))
+        self.assertEqual(venue.next_show_at, soon.replace(microsecond=0))
+
+        later = soon + datetime.timedelta(days=1)
+        self.assertEqual(rollover_counters(now=later), 2)
+        db.session.expire_all()
+        artist = Artist.query.get(artist_id)
+        self.assertEqual((artist.upcoming_shows_count, artist.past_shows_count), (1, 1))
+        self.assertEqual(rollover_counters(now=later), 0)
+
+        db.session.execute('UPDATE "Artist" SET upcoming_shows_count = 9')
+        db.session.commit()
+        self.assertEqual(reconcile_counters(later, repair=False), {'venues': 0, 'artists': 1})
+        self.assertEqual(reconcile_counters(later), {'venues': 0, 'artists': 1})
+        self.assertEqual(reconcile_counters(later, repair=False), {'venues': 0, 'artists': 0})
+
+        self.client().delete('/venues/{}'.format(venue_id))
+        db.session.expire_all()
+        artist = Artist.query.get(artist_id)
+        self.assertEqual((artist.upcoming_shows_count, artist.past_shows_count, artist.next_show_at), (0, 0, None))
+
+    def test_genre_filter_and_cached_facets(self):
+        for name, genres in (('Jazz Bar', ['Jazz', 'Blues']), ('Blues Barn', ['Blues']), ('Rock Room', ['Rock n Roll'])):
+            db.session.add(Venue(name=name, city='San Francisco', state='CA', genres=genres))
+        db.session.commit()
+
+        listing = self.client().get('/api/v1/venues?genre=Blues&fields=name').get_json()
+        both = self.client().get('/api/v1/venues?genre=Blues&genre=Jazz&fields=name').get_json()
+        facets = self.client().get('/api/v1/venues/facets?genre=Blues').get_json()
+
+        self.assertEqual([venue['name'] for venue in listing['venues']], ['Blues Barn', 'Jazz Bar'])
+        self.assertEqual([venue['name'] for venue in both['venues']], ['Jazz Bar'])
+        self.assertEqual(facets['genres'], [{'genre': 'Blues', 'count': 2}, {'genre': 'Jazz', 'count': 1}])
+        self.assertEqual(self.client().get('/api/v1/shows?genre=Jazz').status_code, 400)
+        self.assertIn('Jazz Bar', self.client().get('/venues?genre=Jazz').get_data(as_text=True))
+        self.assertNotIn('Blues Barn', self.client().get('/venues?genre=Jazz').get_data(as_text=True))
+
+        with count_queries() as cached:
+            self.client().get('/api/v1/venues/facets?genre=Blues')
+        self.assertEqual(cached, [])
+
+        self.client().post('/venues/create', data={
+            'name': 'Blue Note', 'city': 'New York', 'state': 'NY', 'address': '131 W 3rd St',
+            'phone': '212-475-8592', 'genres': ['Blues'], 'facebook_link': 'https://www.facebook.com/bluenote'})
+        facets = self.client().get('/api/v1/venues/facets?genre=Blues').get_json()
+        self.assertEqual(facets['genres'][0], {'genre': 'Blues', 'count': 3})
+
+    def test_deletes_cascade_in_the_database(self):
+        artist_id = self.make_artist()
+        few = self.make_venue('Few')
+        many = self.make_venue('Many')
+        self.seed_shows(few, artist_id, 2)
+        self.seed_shows(many, artist_id, 40)
+
+        with count_queries() as few_statements:
+            self.assertEqual(self.client().delete('/venues/{}'.format(few)).status_code, 302)
+        with count_queries() as many_statements:
+            self.client().delete('/venues/{}'.format(many))
+
+        self.assertEqual(len(few_statements), len(many_statements))
+        self.assertEqual(Show.query.count(), 0)
+        self.assertEqual(Artist.query.get(artist_id).past_shows_count, 0)
+        self.assertEqual(self.client().delete('/venues/{}'.format(many)).status_code, 404)
+
+        venue_id = self.make_venue()
+        self.seed_shows(venue_id, artist_id, 3)
+        self.assertEqual(self.client().delete('/artists/{}'.format(artist_id)).status_code, 302)
+        self.assertEqual(Show.query.count(), 0)
+        self.assertEqual(Venue.query.get(venue_id).upcoming_shows_count, 0)
+
+    def test_bulk_delete_api(self):
+        ids = [self.make_artist('Artist {}'.format(i)) for i in range(3)]
+        venue_id = self.make_venue()
+        self.seed_shows(venue_id, ids[0], 2)
+
+        res = self.client().delete('/api/v1/artists', json={'ids': ids[:2] + [999]})
+        self.assertEqual(res.get_json(), {'success': True, 'deleted': 2})
+        self.assertEqual([artist.id for artist in Artist.query.all()], ids[2:])
+        self.assertEqual(Show.query.count(), 0)
+        self.assertEqual(self.client().delete('/api/v1/venues', json={'ids': 'all'}).status_code, 400)
+        self.assertEqual(self.client().delete('/api/v1/venues', json={'ids': []}).status_code, 400)
+
+    def test_schedule_weekly_residency_in_one_insert(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        first = (datetime.datetime.now() + datetime.timedelta(days=1)).replace(hour=20, minute=0, second=0, microsecond=0)
+        self.client().post('/shows/schedule', data={
+            'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': (first + datetime.timedelta(weeks=2)).strftime('%Y-%m-%d %H:%M:%S'),
+            'start_times': ''})
+
+        client = self.client()
+        with count_queries() as statements:
+            res = client.post('/shows/schedule', data={
+                'venue_id': venue_id, 'artist_id': artist_id,
+                'start_time': first.strftime('%Y-%m-%d %H:%M:%S'),
+                'recurrence': 'weekly', 'occurrences': 52, 'start_times': ''})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(Show.query.count(), 52)
+        self.assertEqual(len([s for s in statements if s.startswith('INSERT INTO "Show"')]), 1)
+        self.assertEqual(Venue.query.get(venue_id).upcoming_shows_count, 52)
+        body = client.get('/shows').get_data(as_text=True)
+        self.assertIn('51 shows were successfully listed!', body)
+        self.assertIn('{:%Y-%m-%d %H:%M} was not listed: the venue already has a show then.'.format(
+            first + datetime.timedelta(weeks=2)), body)
+
+    def test_schedule_form_posts_with_its_csrf_token(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        client = self.client()
+        app.config['WTF_CSRF_ENABLED'] = True
+        try:
+            form = client.get('/shows/schedule').get_data(as_text=True)
+            token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', form).group(1)
+            # no start_times field at all: the form's single start time is booked
+            res = client.post('/shows/schedule', data={
+                'csrf_token': token, 'venue_id': venue_id, 'artist_id': artist_id,
+                'start_time': '2035-05-01 20:00:00'})
+            forged = client.post('/shows/schedule', data={
+                'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2035-05-08 20:00:00'})
+        finally:
+            app.config['WTF_CSRF_ENABLED'] = False
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(forged.status_code, 200)
+        self.assertIn('check the artist, venue and start time', forged.get_data(as_text=True))
+        self.assertEqual(Show.query.count(), 1)
+
+    def test_schedule_api_reports_conflicts_and_unknown_references(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        start_times = ['2035-05-01T20:00:00', '2035-05-08T20:00:00', '2035-05-01T20:00:00']
+
+        res = self.client().post('/api/v1/shows/batch', json={
+            'venue_id': venue_id, 'artist_id': artist_id, 'start_times': start_times})
+        again = self.client().post('/api/v1/shows/batch', json={
+            'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': '2035-05-08T20:00:00', 'rule': 'FREQ=WEEKLY;COUNT=2'})
+        unknown = self.client().post('/api/v1/shows/batch', json={
+            'venue_id': 999, 'artist_id': artist_id, 'start_times': start_times})
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.get_json()['scheduled'], start_times[:2])
+        self.assertEqual(res.get_json()['conflicts'],
+                         [{'start_time': start_times[2], 'message': 'listed more than once'}])
+        self.assertEqual(again.get_json()['scheduled'], ['2035-05-15T20:00:00'])
+        self.assertEqual(again.get_json()['conflicts'][0]['message'], 'the venue already has a show then')
+        self.assertEqual(unknown.status_code, 400)
+        self.assertEqual(unknown.get_json()['message'], 'venue 999 does not exist')
+        self.assertEqual(Show.query.count(), 3)
+
+    def test_schedule_api_stores_aware_start_times_as_local_time(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+
+        # naive start times are server-local, like datetime.now()
+        tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'Europe/Berlin'
+        time.tzset()
+        try:
+            res = self.client().post('/api/v1/shows/batch', json={
+                'venue_id': venue_id, 'artist_id': artist_id,
+                'start_times': ['2035-05-01T20:00:00Z', '2035-05-08T20:00:00', '2035-05-15T22:00:00+02:00']})
+        finally:
+            if tz is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = tz
+            time.tzset()
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.get_json()['scheduled'],
+                         ['2035-05-01T22:00:00', '2035-05-08T20:00:00', '2035-05-15T22:00:00'])
+        self.assertEqual(Show.query.count(), 3)
+
+    def test_overlapping_shows_are_rejected_and_audited(self):
+        venue_id = self.make_venue()
+        other_venue_id = self.make_venue(name='Park Square Live Music & Coffee')
+        artist_id = self.make_artist()
+        other_artist_id = self.make_artist(name='The Wild Sax Band')
+
+        res = self.client().post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2035-06-01 20:00:00', 'duration': 90})
+        venue_clash = self.client().post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': other_artist_id, 'start_time': '2035-06-01 21:00:00'})
+        artist_clash = self.client().post('/shows/create', data={
+            'venue_id': other_venue_id, 'artist_id': artist_id, 'start_time': '2035-06-01 19:00:00'})
+        after = self.client().post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': other_artist_id, 'start_time': '2035-06-01 21:30:00'})
+        batch = self.client().post('/api/v1/shows/batch', json={
+            'venue_id': other_venue_id, 'artist_id': other_artist_id, 'duration': 60,
+            'start_times': ['2035-07-01T20:00:00', '2035-07-01T20:30:00', '2035-07-01T21:00:00']})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(venue_clash.status_code, 409)
+        self.assertIn('the venue already has a show then', venue_clash.get_data(as_text=True))
+        self.assertEqual(artist_clash.status_code, 409)
+        self.assertIn('the artist already has a show then', artist_clash.get_data(as_text=True))
+        self.assertEqual(after.status_code, 302)
+        self.assertEqual(batch.get_json()['scheduled'], ['2035-07-01T20:00:00', '2035-07-01T21:00:00'])
+        self.assertEqual(batch.get_json()['conflicts'],
+                         [{'start_time': '2035-07-01T20:30:00', 'message': 'overlaps another show of this batch'}])
+        self.assertEqual(Show.query.count(), 4)
+        self.assertEqual(list(show_conflicts()), [])
+
+        # shows booked before the slot indexes existed may still overlap
+        first = Show(venue_id=venue_id, artist_id=artist_id, start_time=datetime.datetime(2035, 8, 1, 20))
+        second = Show(venue_id=other_venue_id, artist_id=artist_id, start_time=datetime.datetime(2035, 8, 1, 21))
+        db.session.add_all([first, second])
+        db.session.commit()
+        self.assertEqual(list(show_conflicts()), [
+            ('artist', artist_id, first.id, first.start_time, second.id, second.start_time)])
+        res = app.test_cli_runner().invoke(args=['fyyur', 'conflicts'])
+        self.assertEqual(res.exit_code, 1)
+        self.assertIn('artist {}: show {} at 2035-08-01 20:00 overlaps show {}'.format(
+            artist_id, first.id, second.id), res.output)
+
+    def artist_form(self, artist_id, **changes):
+        artist = Artist.query.get(artist_id)
+        data = {'name': artist.name, 'city': artist.city, 'state': artist.state, 'phone': artist.phone,
+                'image_link': artist.image_link, 'genres': artist.genres,
+                'facebook_link': artist.facebook_link, 'version': artist.version}
+        data.update(changes)
+        return {key: value for key, value in data.items() if value is not None}
+
+    def test_edit_updates_only_changed_columns(self):
+        artist_id = self.make_artist()
+        unchanged = self.artist_form(artist_id)
+        renamed = self.artist_form(artist_id, name='Guns N Roses')
+
+        with count_queries() as noop:
+            self.assertEqual(self.client().post('/artists/{}/edit'.format(artist_id), data=unchanged).status_code, 302)
+        with count_queries() as edit:
+            self.client().post('/artists/{}/edit'.format(artist_id), data=renamed)
+
+        self.assertFalse([statement for statement in noop if statement.startswith('UPDATE')])
+        updates = [statement for statement in edit if statement.startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('name=', updates[0].replace(' ', ''))
+        self.assertNotIn('city=', updates[0].replace(' ', ''))
+        db.session.expire_all()
+        artist = Artist.query.get(artist_id)
+        self.assertEqual((artist.name, artist.version), ('Guns N Roses', 2))
+
+    def test_concurrent_edit_is_rejected_with_409(self):
+        venue_id = self.make_venue()
+        venue = Venue.query.get(venue_id)
+        form = {'name': venue.name, 'city': venue.city, 'state': venue.state,
+                'genres': venue.genres, 'version': venue.version}
+
+        first = self.client().post('/venues/{}/edit'.format(venue_id), data=dict(form, city='Oakland'))
+        second = self.client().post('/venues/{}/edit'.format(venue_id), data=dict(form, name='The Hop'))
+
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second.status_code, 409)
+        self.assertIn('was changed by someone else', second.get_data(as_text=True))
+        self.assertIn('value="Oakland"', second.get_data(as_text=True))
+        db.session.expire_all()
+        venue = Venue.query.get(venue_id)
+        self.assertEqual((venue.name, venue.city, venue.version), ('The Musical Hop', 'Oakland', 2))
+
+    def test_calendar_window_with_per_day_counts(self):
+        hop = self.make_venue('The Musical Hop', 'San Francisco')
+        bar = self.make_venue('The Dueling Pianos Bar', 'New York')
+        artist_id = self.make_artist()
+        for venue_id, day, hour in [(hop, 3, 20), (hop, 3, 22), (hop, 5, 20), (bar, 3, 21), (hop, 9, 20)]:
+            db.session.add(Show(venue_id=venue_id, artist_id=artist_id,
+                                start_time=datetime.datetime(2035, 4, day, hour)))
+        db.session.commit()
+
+        with count_queries() as statements:
+            res = self.client().get('/api/v1/calendar?from=2035-04-01&to=2035-04-08&city=San+Francisco')
+        data = res.get_json()
+        month = self.client().get('/api/v1/calendar?month=2035-04&genre=Rock+n+Roll').get_json()
+        page = self.client().get('/calendar?from=2035-04-01&to=2035-04-08').get_data(as_text=True)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(statements), 2)
+        self.assertEqual([day['count'] for day in data['days']], [0, 0, 2, 0, 1, 0, 0])
+        self.assertEqual([show['venue_name'] for show in data['shows']], ['The Musical Hop'] * 3)
+        self.assertEqual(len(month['days']), 30)
+        self.assertEqual(sum(day['count'] for day in month['days']), 5)
+        self.assertIn('The Dueling Pianos Bar', page)
+        self.assertIn('<span class="badge">3</span>', page)
+        self.assertEqual(self.client().get('/api/v1/calendar?from=2035-04-08&to=2035-04-01').status_code, 400)
+        self.assertEqual(self.client().get('/api/v1/calendar?from=2035-01-01&to=2036-01-01').status_code, 400)
+        self.assertEqual(self.client().get('/calendar?month=April').status_code, 400)
+
+    def test_reads_use_the_replica_except_right_after_a_write(self):
+        venue_id = self.make_venue()
+        app.config['SQLALCHEMY_BINDS'] = {'replica0': replica_database_path}
+        replica = db.get_engine(app, bind='replica0')
+        try:
+            db.metadata.drop_all(replica)
+            db.metadata.create_all(replica)
+            replica.execute(Venue.__table__.insert(), id=venue_id, name='The Replica Hop',
+                            city='San Francisco', state='CA', genres=['Jazz'])
+            venue = Venue.query.get(venue_id)
+            form = {'name': 'The Primary Hop', 'city': venue.city, 'state': venue.state,
+                    'genres': venue.genres, 'version': venue.version}
+            db.session.remove()
+            client = self.client()
+
+            before = client.get('/venues/{}'.format(venue_id)).get_data(as_text=True)
+            edit_form = client.get('/venues/{}/edit'.format(venue_id)).get_data(as_text=True)
+            edit = client.post('/venues/{}/edit'.format(venue_id), data=form)
+            after = client.get('/venues/{}'.format(venue_id)).get_data(as_text=True)
+            other = self.client().get('/venues').get_data(as_text=True)
+            with client.session_transaction() as session:
+                session['read_primary_until'] = 0
+            later = client.get('/venues').get_data(as_text=True)
+            replica_name = replica.execute(Venue.__table__.select()).first().name
+        finally:
+            db.session.remove()
+            app.config['SQLALCHEMY_BINDS'] = {}
+            db.metadata.drop_all(replica)
+            replica.dispose()
+
+        self.assertIn('The Replica Hop', before)
+        self.assertIn('value="The Musical Hop"', edit_form)
+        self.assertEqual(edit.status_code, 302)
+        self.assertIn('The Primary Hop', after)
+        self.assertIn('The Replica Hop', other)
+        self.assertIn('The Replica Hop', later)
+        self.assertEqual(replica_name, 'The Replica Hop')
+
+    def test_asgi_read_routes_match_wsgi(self):
+        try:
+            import httpx
+            from asgi import FyyurASGI
+        except ImportError as e:
+            self.skipTest('async serving dependencies missing: {}'.format(e))
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 4)
+        paths = ['/venues', '/venues/{}'.format(venue_id), '/artists/{}'.format(artist_id), '/shows']
+        expected = {}
+        for path in paths:
+            expected[path] = self.client().get(path).get_data(as_text=True)
+        render_cache.clear()
+
+        async def fetch():
+            server = FyyurASGI(app)
+            try:
+                transport = httpx.ASGITransport(app=server)
+                async with httpx.AsyncClient(transport=transport, base_url='http://localhost') as client:
+                    pages = await asyncio.gather(*[client.get(path) for path in paths])
+                    search = await client.post('/venues/search', data={'search_term': 'hop'})
+                    home = await client.get('/')
+                return pages, search, home
+            finally:
+                await server.dispose()
+
+        pages, search, home = asyncio.run(fetch())
+
+        for path, res in zip(paths, pages):
+            self.assertEqual(res.status_code, 200, path)
+            self.assertEqual(res.text, expected[path], path)
+        self.assertEqual(search.status_code, 200)
+        self.assertIn('The Musical Hop', search.text)
+        self.assertEqual(home.status_code, 200)
+
+    def test_asgi_reads_use_the_replica_and_stream(self):
+        try:
+            from asgi import FyyurASGI
+        except ImportError as e:
+            self.skipTest('async serving dependencies missing: {}'.format(e))
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        db.session.remove()
+
+        async def get(server, path):
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                messages.append(message)
+
+            await server({'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                          'headers': []}, receive, send)
+            return messages
+
+        async def fetch():
+            server = FyyurASGI(app)
+            try:
+                return await get(server, '/venues/{}'.format(venue_id)), await get(server, '/shows')
+            finally:
+                await server.dispose()
+
+        app.config['SQLALCHEMY_BINDS'] = {'replica0': replica_database_path}
+        replica = db.get_engine(app, bind='replica0')
+        try:
+            db.metadata.drop_all(replica)
+            db.metadata.create_all(replica)
+            replica.execute(Venue.__table__.insert(), id=venue_id, name='The Replica Hop',
+                            city='San Francisco', state='CA', genres=['Jazz'])
+            replica.execute(Artist.__table__.insert(), id=artist_id, name='Guns N Petals',
+                            city='San Francisco', state='CA', genres=['Rock n Roll'])
+            replica.execute(Show.__table__.insert(), [
+                {'venue_id': venue_id, 'artist_id': artist_id,
+                 'start_time': datetime.datetime(2035, 1, 1) + datetime.timedelta(days=i)}
+                for i in range(PAGE_SIZE)])
+            page, shows = asyncio.run(fetch())
+        finally:
+            app.config['SQLALCHEMY_BINDS'] = {}
+            db.metadata.drop_all(replica)
+            replica.dispose()
+
+        self.assertEqual(page[0]['status'], 200)
+        self.assertIn(b'The Replica Hop', b''.join(message.get('body', b'') for message in page[1:]))
+        self.assertEqual(shows[0]['status'], 200)
+        self.assertGreater(len([message for message in shows if message.get('more_body')]), 1)
+        self.assertEqual(shows[-1], {'type': 'http.response.body', 'body': b''})
+
+    def test_artists_keyset_pages_forward_and_back(self):
+        for i in range(PAGE_SIZE + 5):
+            self.make_artist('Artist {:03d}'.format(i))
+
+        first = paginate(Artist.query, [Artist.name, Artist.id], lambda a: (a.name, a.id))
+        second = paginate(Artist.query, [Artist.name, Artist.id], lambda a: (a.name, a.id),
+                          after=first.next_cursor)
+        back = paginate(Artist.query, [Artist.name, Artist.id], lambda a: (a.name, a.id),
+                        before=second.prev_cursor)
+
+        self.assertEqual(len(first.items), PAGE_SIZE)
+        self.assertIsNone(first.prev_cursor)
+        self.assertEqual([a.name for a in second.items],
+                         ['Artist {:03d}'.format(i) for i in range(PAGE_SIZE, PAGE_SIZE + 5)])
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual([a.id for a in back.items], [a.id for a in first.items])
+        self.assertIsNone(back.prev_cursor)
+
+    def test_shows_page_follows_cursor(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, PAGE_SIZE + 1)
+
+        res = self.client().get('/shows')
+        body = res.get_data(as_text=True)
+        cursor = body.split('after=')[1].split('"')[0]
+        res = self.client().get('/shows?after=' + cursor)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_data(as_text=True).count('tile-show'), 1)
+
+    def test_shows_page_is_streamed_and_keeps_its_page_size(self):
+        venue_id = self.make_venue()
+        artist_id = self.make_artist()
+        self.seed_shows(venue_id, artist_id, 12)
+
+        first = self.client().get('/shows?per_page=5')
+        self.assertTrue(first.is_streamed)
+        body = first.get_data(as_text=True)
+        next_link = body.split('href="/shows?')[1].split('"')[0].replace('&amp;', '&')
+        second = self.client().get('/shows?' + next_link).get_data(as_text=True)
+        prev_link = second.split('href="/shows?')[1].split('"')[0].replace('&amp;', '&')
+        back = self.client().get('/shows?' + prev_link).get_data(as_text=True)
+
+        self.assertEqual(body.count('tile-show'), 5)
+        self.assertIn('per_page=5', body)
+        self.assertEqual(second.count('tile-show'), 5)
+        self.assertEqual(back.count('tile-show'), 5)
+        self.assertNotIn('before=', back)
+        self.assertEqual(self.client().get('/shows?after=not-a-cursor').status_code, 400)
+
+    def test_bad_cursor_is_rejected(self):
+        self.make_artist()
+        res = self.client().get('/artists?after=not-a-cursor')
+        # well-formed cursors whose values do not fit the sort columns
+        wrong_types = [self.client().get('/artists?after=' + encode_cursor(values))
+                       for values in (['Guns N Petals', 'x'], ['Guns N Petals', True], [1, 1])]
+        shows = self.client().get('/shows?before=' + encode_cursor(['yesterday', 1]))
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([res.status_code for res in wrong_types], [400, 400, 400])
+        self.assertEqual(shows.status_code, 400)
+        self.assertEqual(self.client().get('/artists?after=' + encode_cursor(['Guns N Petals', 0])).status_code, 200)
+
+    def test_search_venues_ranks_name_matches_first(self):
+        self.make_venue('Park Square Live Music & Coffee', 'San Francisco')
+        self.make_venue('The Musical Hop', 'San Francisco')
+        self.make_venue('The Dueling Pianos Bar', 'Music City')
+
+        with count_queries() as statements:
+            results, total = search(Venue, 'music')
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(total, 3)
+        self.assertEqual(results[-1].name, 'The Dueling Pianos Bar')
+
+    def test_search_artists_by_city_state_and_genre(self):
+        self.make_artist('Guns N Petals', 'San Francisco')
+        self.make_artist('Matt Quevedo', 'New York')
+
+        res = self.client().post('/artists/search', data={'search_term': 'San Francisco, CA'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('Guns N Petals', res.get_data(as_text=True))
+        self.assertNotIn('Matt Quevedo', res.get_data(as_text=True))
+        self.assertEqual(search(Artist, 'rock')[1], 2)
+
+    def test_search_matches_partial_names(self):
+        for name in ('Guns N Petals', 'Matt Quevado', 'The Wild Sax Band', 'Solo Cellist'):
+            self.make_artist(name)
+        self.make_venue('Park Square Live Music & Coffee')
+        self.make_venue('100% Hop')
+
+        res = self.client().post('/artists/search', data={'search_term': 'A'})
+        results, total = search(Artist, 'A')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(total, 3)
+        self.assertEqual([artist.name for artist in results], ['Guns N Petals', 'Matt Quevado', 'The Wild Sax Band'])
+        self.assertIn('Guns N Petals', res.get_data(as_text=True))
+        self.assertEqual([venue.name for venue in search(Venue, 'usic')[0]], ['Park Square Live Music & Coffee'])
+        self.assertEqual([venue.name for venue in search(Venue, '0%')[0]], ['100% Hop'])
+        self.assertEqual(search(Artist, 'band')[1], 1)
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """EXPLAINs every statement the read routes run against a seeded database
+    and fails when one of them falls back to a sequential scan of Show"""
+
+    venues = 200
+    artists = 200
+    shows = 20000
+
+    @classmethod
+    def setUpClass(cls):
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_path
+        app.config['TESTING'] = True
+        cls.ctx = app.app_context()
+        cls.ctx.push()
+        db.drop_all()
+        db.create_all()
+        now = datetime.datetime.now()
+        db.session.execute(Venue.__table__.insert(), [
+            {'name': 'Venue {}'.format(i), 'city': 'City {}'.format(i % 20), 'state': 'CA', 'genres': ['Jazz']}
+            for i in range(cls.venues)])
+        db.session.execute(Artist.__table__.insert(), [
+            {'name': 'Artist {}'.format(i), 'city': 'City {}'.format(i % 20), 'state': 'CA', 'genres': ['Jazz']}
+            for i in range(cls.artists)])
+        db.session.execute(Show.__table__.insert(), [
+            {'venue_id': i % cls.venues + 1, 'artist_id': i * 7 % cls.artists + 1,
+             'start_time': now + datetime.timedelta(hours=i - cls.shows // 2)}
+            for i in range(cls.shows)])
+        db.session.commit()
+        with db.engine.connect() as connection:
+            connection.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql('ANALYZE')
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls.ctx.pop()
+
+    def explain_route(self, path):
+        with self.explained(path):
+            res = app.test_client().get(path)
+            res.get_data()
+        self.assertEqual(res.status_code, 200)
+
+    @contextmanager
+    def explained(self, label):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN ' + statement, parameters)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                self.assertNotIn('Seq Scan on "Show"', plan,
+                                 '{} scans Show:\n{}\n{}'.format(label, statement, plan))
+        finally:
+            connection.close()
+
+    def test_show_venue_plan(self):
+        self.explain_route('/venues/1')
+
+    def test_show_artist_plan(self):
+        self.explain_route('/artists/1')
+
+    def test_venues_plan(self):
+        self.explain_route('/venues')
+
+    def test_shows_plan(self):
+        self.explain_route('/shows')
+
+    def test_calendar_plan(self):
+        self.explain_route('/calendar')
+        self.explain_route('/api/v1/calendar?city=City+3')
+
+    def test_booking_plan(self):
+        start_times = [datetime.datetime.now() + datetime.timedelta(weeks=i) for i in range(20)]
+        with self.explained('the overlap check'):
+            booked_slots([(1, 1, start_time) for start_time in start_times], SHOW_DURATION)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import datetime
+from collections import namedtuple
+
+from models import db, Show, Artist, Venue
+
+'''
+Timeline
+    the shows of one venue or artist, split into upcoming and past.
+    upcoming_shows is soonest first, past_shows is most recent first.
+'''
+Timeline = namedtuple('Timeline', [
+    'upcoming_shows', 'past_shows',
+    'upcoming_shows_count', 'past_shows_count',
+])
+
+
+def _show_rows():
+    return db.session.query(
+        Show.id.label('show_id'),
+        Show.start_time.label('start_time'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+    ).join(Artist, Show.artist_id == Artist.id) \
+     .join(Venue, Show.venue_id == Venue.id) \
+     .filter(Show.start_time.isnot(None))
+
+
+def partition_shows(rows, now=None):
+    '''
+    partition_shows(rows, now)
+        splits rows ordered by start_time into a Timeline in a single pass
+    '''
+    if now is None:
+        now = datetime.datetime.now()
+    upcoming = []
+    past = []
+    for row in rows:
+        if row.start_time >= now:
+            upcoming.append(row)
+        else:
+            past.append(row)
+    past.reverse()
+    return Timeline(upcoming, past, len(upcoming), len(past))
+
+
+def venue_timeline(venue_id, now=None):
+    rows = _show_rows().filter(Show.venue_id == venue_id) \
+        .order_by(Show.start_time, Show.id).all()
+    return partition_shows(rows, now)
+
+
+def artist_timeline(artist_id, now=None):
+    rows = _show_rows().filter(Show.artist_id == artist_id) \
+        .order_by(Show.start_time, Show.id).all()
+    return partition_shows(rows, now)
+
+
+def next_rollover(timeline):
+    '''
+    next_rollover(timeline)
+        when the soonest upcoming show starts and moves into past_shows,
+        or None when nothing is upcoming
+    '''
+    if timeline.upcoming_shows:
+        return timeline.upcoming_shows[0].start_time
+    return None
@@ -5,13 +5,24 @@ from flask_cors import CORS
 import random
 
 from models import setup_db, Question, Category
+from compression import init_compression
 
 QUESTIONS_PER_PAGE = 10
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
+  if test_config is not None:
+    app.config.from_mapping(test_config)
   setup_db(app)
+  compression = init_compression(app)
+
+  # worker internals, only served when STATS_ENDPOINTS is on
+  if app.config.get('STATS_ENDPOINTS', False):
+    @app.route('/_stats/compression')
+    def compression_statistics():
+      # gzip / brotli counters of this worker: compression ratio and CPU time
+      return jsonify(compression.stats.snapshot())
   
   '''
   @TODO: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs